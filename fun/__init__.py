@@ -1,4 +1,5 @@
 import os, sys
 sys.path.append(os.path.dirname(__file__))
-__all__ = ["converter"]
-import converter
\ No newline at end of file
+__all__ = ["converter", "lru_store"]
+import converter
+import lru_store
\ No newline at end of file
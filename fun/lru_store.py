@@ -0,0 +1,70 @@
+import os, json
+
+
+class LRUFileStore:
+    def __init__(self, cache_dir, max_bytes=2**30):
+        """
+        Directory of cached files with an index.json of file names, sizes, and last access times (base class of
+        workbooks.xlsx.SheetCache and plotting.plotter.RenderCache)
+        Index entries are DICTs with at least "file" (STR file name in cache_dir), "bytes" (INT), and "last_access"
+        (FLOAT time.time())
+        :param cache_dir: STR directory of the cache (created if it does not exist)
+        :param max_bytes: [optional] INT size limit of all cached files (least recently used files are evicted first)
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = int(max_bytes)
+        self.index_file = os.path.join(self.cache_dir, "index.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with open(self.index_file) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def clear(self):
+        """
+        Remove all cached files
+        """
+        for key in list(self.index):
+            self.drop(key)
+        self.save_index()
+
+    def drop(self, key):
+        """
+        Remove one cached file
+        :param key: STR of the index key
+        """
+        entry = self.index.pop(key, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except OSError:
+                pass
+
+    def evict(self):
+        """
+        Remove least recently used files until the cache fits into max_bytes
+        """
+        total = sum(entry["bytes"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["bytes"]
+            self.on_evict(self.index[key])
+            self.drop(key)
+
+    def on_evict(self, entry):
+        """
+        Called before an entry is evicted (does nothing - for logging in subclasses)
+        :param entry: DICT of the index entry
+        """
+        pass
+
+    def save_index(self):
+        """
+        Write the index atomically (temporary file and rename)
+        """
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_file, self.index_file)
@@ -1,26 +1,72 @@
+import gdal
 from gdal import ogr
 from gdal import osr
-import urllib
+import urllib.request
+import functools
+import zipfile
+import struct
+import json
+import time
 import os
+import numpy as np
+
+# default WKT (epsg=4326) returned if a projection cannot be found
+WGS84_ESRIWKT = 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295],UNIT["Meter",1]]'
+
+# on-disk store of WKT strings filled from osr (no network) - set the WKT_CACHE_FILE environment variable to share
+# a store between compute nodes
+WKT_CACHE_FILE = os.environ.get("WKT_CACHE_FILE",
+                                os.path.join(os.path.expanduser("~"), ".cache", "shp_control", "wkt_cache.json"))
+_WKT_STORE = None  # DICT of the on-disk store (loaded with the first lookup)
+
+# vector drivers by file extension (create_shp uses ESRI Shapefile for other extensions)
+DRIVERS = {".shp": "ESRI Shapefile",
+           ".gpkg": "GPKG",
+           ".fgb": "FlatGeobuf"}
+# layer creation options by driver (GeoPackage: R*Tree spatial index, FlatGeobuf: packed Hilbert R-tree)
+LAYER_OPTIONS = {"GPKG": ["SPATIAL_INDEX=YES"],
+                 "FlatGeobuf": ["SPATIAL_INDEX=YES"]}
+# SQLite tuning of GeoPackage writing (write-ahead log, no fsync per transaction, 512 MB page cache)
+GPKG_CONFIG = {"OGR_SQLITE_JOURNAL": "WAL",
+               "OGR_SQLITE_SYNCHRONOUS": "OFF",
+               "OGR_SQLITE_CACHE": "512"}
 
 
 def create_shp(shp_file_dir, overwrite=True, *args, **kwargs):
     """
-    Create a new shapefile with a defined geometry type (optional)
-    :param shp_file_dir: STR of the (relative shapefile directory (ends on ".shp")
+    Create a new shapefile, GeoPackage, or FlatGeobuf file with a defined geometry type (optional)
+    The driver is chosen from the file extension (see DRIVERS): ".shp" = ESRI Shapefile, ".gpkg" = GeoPackage with
+    spatial index and write-ahead log, ".fgb" = FlatGeobuf with packed Hilbert R-tree
+    :param shp_file_dir: STR of the (relative) file directory (ends on ".shp", ".gpkg", or ".fgb")
     :param overwrite: [optional] BOOL - if True, existing files are overwritten
     :kwarg layer_name: [optional] STR of the layer_name - if None: no layer will be created
     :kwarg layer_type: [optional] STR ("point, "line", or "polygon") of the layer_name - if None: no layer will be created
-    :output: ogr shapefile
+    :kwarg epsg: [optional] INT of the epsg code of the layer's spatial reference
+    :kwarg z: [optional] BOOL - if True, the layer geometries have z coordinates (25D geometry type)
+    :kwarg driver: [optional] STR of an ogr driver name that overrides the file extension
+    :output: ogr shapefile (datasource)
     """
-    shp_driver = ogr.GetDriverByName("ESRI Shapefile")
+    driver_name = kwargs.get("driver") or DRIVERS.get(os.path.splitext(shp_file_dir)[1].lower(), "ESRI Shapefile")
+    shp_driver = ogr.GetDriverByName(driver_name)
 
     # check if output file exists if yes delete it
     if os.path.exists(shp_file_dir) and overwrite:
         shp_driver.DeleteDataSource(shp_file_dir)
 
+    # set the SQLite tuning only while the GeoPackage is opened (user-defined configuration options have priority)
+    tuned_keys = []
+    if driver_name == "GPKG":
+        for key, value in GPKG_CONFIG.items():
+            if gdal.GetConfigOption(key) is None:
+                gdal.SetConfigOption(key, value)
+                tuned_keys.append(key)
+
     # create and return new shapefile object
-    new_shp = shp_driver.CreateDataSource(shp_file_dir)
+    try:
+        new_shp = shp_driver.CreateDataSource(shp_file_dir)
+    finally:
+        for key in tuned_keys:
+            gdal.SetConfigOption(key, None)
 
     # create layer if layer_name and layer_type are provided
     if kwargs.get("layer_name") and kwargs.get("layer_type"):
@@ -29,10 +75,20 @@ def create_shp(shp_file_dir, overwrite=True, *args, **kwargs):
                          "points": ogr.wkbMultiPoint,
                          "line": ogr.wkbMultiLineString,
                          "polygon": ogr.wkbMultiPolygon}
+        if kwargs.get("z"):
+            geometry_dict = {"point": ogr.wkbPoint25D,
+                             "points": ogr.wkbMultiPoint25D,
+                             "line": ogr.wkbMultiLineString25D,
+                             "polygon": ogr.wkbMultiPolygon25D}
+        srs = None
+        if kwargs.get("epsg"):
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(int(kwargs.get("epsg")))
         # create layer
         try:
-            new_shp.CreateLayer(str(kwargs.get("layer_name")),
-                                geom_type=geometry_dict[str(kwargs.get("layer_type").lower())])
+            new_shp.CreateLayer(str(kwargs.get("layer_name")), srs=srs,
+                                geom_type=geometry_dict[str(kwargs.get("layer_type").lower())],
+                                options=LAYER_OPTIONS.get(driver_name, []))
         except KeyError:
             print("Error: Invalid layer_type provided (must be 'point', 'line', or 'polygon').")
         except TypeError:
@@ -40,13 +96,349 @@ def create_shp(shp_file_dir, overwrite=True, *args, **kwargs):
     return new_shp
 
 
-def get_esriwkt(epsg):
+def write_features(shp_file_dir, layer_type, coords, offsets=None, attributes=None, *args, **kwargs):
     """
-    Get esriwkt-formatted spatial references with epsg code online
+    Write many features from NumPy arrays to a new shapefile, GeoPackage, or FlatGeobuf file (created with create_shp)
+    in large transactions
+    Usage: write_features("xs_points.shp", "point", xy, attributes={"xs_id": ids, "z": z}, epsg=25832)
+    :param shp_file_dir: STR of the (relative) file directory (ends on ".shp", ".gpkg", or ".fgb" - see create_shp)
+    :param layer_type: STR ("point", "points", "line", or "polygon")
+    :param coords: NUMPY ARRAY of shape (n_vertices, 2) or (n_vertices, 3) with x, y (and z) coordinates
+    :param offsets: NUMPY ARRAY of n_features + 1 start indices of every feature in coords (ragged points, lines,
+                    and polygons - every polygon is one ring); not used for point layers (one feature per vertex)
+    :param attributes: [optional] DICT of field names and NUMPY ARRAYS (one value per feature) - the field
+                       definitions are derived from the array dtypes (int, float, bool, str)
+    :kwarg layer_name: [optional] STR of the layer name (default: file name without extension)
+    :kwarg epsg: [optional] INT of the epsg code of the layer's spatial reference
+    :kwarg batch_size: [optional] INT number of features per transaction (default: 50000)
+    :kwarg overwrite: [optional] BOOL - if True (default), existing files are overwritten
+    :output: DICT with n_features, seconds, and features_per_second (-1 if error)
+    """
+    start = time.perf_counter()
+    layer_type = str(layer_type).lower()
+    coords = np.ascontiguousarray(coords, dtype="<f8")
+    if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+        print("Error: coords must have the shape (n_vertices, 2) or (n_vertices, 3).")
+        return -1
+    if layer_type == "point":
+        offsets = np.arange(coords.shape[0] + 1)
+    elif offsets is None:
+        print("Error: offsets are required for points, line, and polygon layers.")
+        return -1
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_features = offsets.size - 1
+    attributes = {name: np.asarray(values) for name, values in (attributes or {}).items()}
+    for name, values in attributes.items():
+        if values.shape[0] != n_features:
+            print("Error: attribute {0} has {1} values for {2} features.".format(name, values.shape[0], n_features))
+            return -1
+
+    layer_name = kwargs.get("layer_name") or os.path.splitext(os.path.basename(shp_file_dir))[0]
+    data_source = create_shp(shp_file_dir, kwargs.get("overwrite", True), layer_name=layer_name,
+                             layer_type=layer_type, epsg=kwargs.get("epsg"), z=coords.shape[1] == 3)
+    layer = data_source.GetLayer(0)
+    if layer is None:
+        print("Error: Could not create layer in " + str(shp_file_dir))
+        return -1
+    for name, values in attributes.items():
+        layer.CreateField(_field_definition(name, values))
+    layer_definition = layer.GetLayerDefn()
+    # fields are created in order (drivers may truncate or rename the field names, e.g., shapefiles to 10 characters)
+    field_indices = list(range(len(attributes)))
+    # python lists are much faster to set field by field than numpy scalars
+    columns = [values.astype(bool).astype(int).tolist() if values.dtype.kind == "b" else values.tolist()
+               for values in attributes.values()]
+
+    batch_size = int(kwargs.get("batch_size", 50000))
+    use_transactions = _start_transaction(layer)
+    feature = ogr.Feature(layer_definition)
+    for feature_no, wkb in enumerate(_features2wkb(layer_type, coords, offsets)):
+        feature.SetFID(-1)
+        feature.SetGeometryDirectly(ogr.CreateGeometryFromWkb(wkb))
+        for field_index, column in zip(field_indices, columns):
+            feature.SetField(field_index, column[feature_no])
+        layer.CreateFeature(feature)
+        if use_transactions and (feature_no + 1) % batch_size == 0:
+            layer.CommitTransaction()
+            layer.StartTransaction()
+    if use_transactions:
+        layer.CommitTransaction()
+    data_source.FlushCache()
+    data_source = None  # closes and writes the file
+
+    seconds = time.perf_counter() - start
+    stats = {"n_features": n_features, "seconds": seconds, "features_per_second": n_features / max(seconds, 1e-9)}
+    print(" * Wrote {n_features} features in {seconds:.1f} s ({features_per_second:.0f} features/s)".format(**stats))
+    return stats
+
+
+def _features2wkb(layer_type, coords, offsets):
+    # yields little-endian (ISO) WKB bytes per feature built from the coordinate array without per-vertex Python calls
+    z_flag = 1000 if coords.shape[1] == 3 else 0
+    buffer = coords.tobytes()
+    vertex_bytes = coords.shape[1] * 8
+    if layer_type in ("point", "points"):
+        # all points in one buffer of 1 + 4 + vertex_bytes bytes per point
+        points = np.empty(coords.shape[0], dtype=[("order", "u1"), ("type", "<u4"), ("xyz", "<f8", coords.shape[1])])
+        points["order"] = 1
+        points["type"] = 1 + z_flag
+        points["xyz"] = coords
+        buffer = points.tobytes()
+        vertex_bytes = points.itemsize
+    for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        if layer_type == "point":
+            yield buffer[start * vertex_bytes:end * vertex_bytes]
+        elif layer_type == "points":
+            yield struct.pack("<BII", 1, 4 + z_flag, end - start) + buffer[start * vertex_bytes:end * vertex_bytes]
+        elif layer_type == "line":
+            yield (struct.pack("<BIIBII", 1, 5 + z_flag, 1, 1, 2 + z_flag, end - start) +
+                   buffer[start * vertex_bytes:end * vertex_bytes])
+        elif layer_type == "polygon":
+            ring = buffer[start * vertex_bytes:end * vertex_bytes]
+            n_vertices = end - start
+            if not np.array_equal(coords[start], coords[end - 1]):
+                # close the ring
+                ring += buffer[start * vertex_bytes:(start + 1) * vertex_bytes]
+                n_vertices += 1
+            yield struct.pack("<BIIBIII", 1, 6 + z_flag, 1, 1, 3 + z_flag, 1, n_vertices) + ring
+        else:
+            raise ValueError("Invalid layer_type (must be 'point', 'points', 'line', or 'polygon').")
+
+
+def _field_definition(name, values):
+    # returns ogr.FieldDefn of a numpy attribute array
+    if values.dtype.kind in "iu":
+        field_type = ogr.OFTInteger64 if values.dtype.itemsize > 4 or values.dtype == np.uint32 else ogr.OFTInteger
+    elif values.dtype.kind == "f":
+        field_type = ogr.OFTReal
+    elif values.dtype.kind == "b":
+        field_type = ogr.OFTInteger
+    else:
+        field_type = ogr.OFTString
+    field_definition = ogr.FieldDefn(str(name), field_type)
+    if field_type == ogr.OFTString:
+        field_definition.SetWidth(int(min(max([len(str(v)) for v in values.tolist()] + [1]), 254)))
+    return field_definition
+
+
+def _start_transaction(layer):
+    # returns True if the layer (driver) supports transactions
+    try:
+        return layer.StartTransaction() == 0
+    except RuntimeError:
+        return False
+
+
+def read_features(file_dir, chunk_size=10000, where=None, bbox=None, columns=None, geometry="wkb", **kwargs):
+    """
+    Read features in chunks of arrays - zipped shapefiles are opened in place (through /vsizip/) without unzipping
+    Filters and column selections are passed to ogr, so that only the required features and fields are decoded.
+    Usage: for chunk in read_features("slackwater-poly.zip", where="area > 10", bbox=(x_min, y_min, x_max, y_max)):
+    :param file_dir: STR of a .zip (containing a shapefile), .shp, .gpkg, .fgb, or /vsizip/ path
+    :param chunk_size: [optional] INT maximum number of features per chunk
+    :param where: [optional] STR of an attribute filter (OGR SQL WHERE clause), e.g., "depth > 0.5"
+    :param bbox: [optional] TUPLE of (x_min, y_min, x_max, y_max) spatial filter
+    :param columns: [optional] LIST of STR field names to read (default: all fields)
+    :param geometry: [optional] STR "wkb" (default), "coords", or None (no geometries)
+    :kwarg layer: [optional] INT or STR of the layer (default: 0)
+    :kwarg shp_name: [optional] STR of the shapefile name in the zip file (default: first .shp file)
+    :output: yields DICT chunks with
+             fid = NUMPY ARRAY of feature IDs
+             geometry = NUMPY ARRAY of WKB bytes (geometry="wkb")
+             coords, part_offsets, feature_parts = NUMPY ARRAYS (geometry="coords") - the vertices of feature i
+                are the parts (rings or lines) part_offsets[feature_parts[i]:feature_parts[i + 1] + 1] of coords
+             one NUMPY ARRAY per field
+    """
+    path = file_dir
+    if str(file_dir).lower().endswith(".zip"):
+        path = zip2vsi(file_dir, kwargs.get("shp_name"))
+    data_source = ogr.Open(path)
+    if data_source is None:
+        print("Error: Could not open " + str(path))
+        return
+    try:
+        layer = data_source.GetLayer(kwargs.get("layer", 0))
+        layer_definition = layer.GetLayerDefn()
+        field_names = [layer_definition.GetFieldDefn(i).GetName() for i in range(layer_definition.GetFieldCount())]
+        if columns is not None:
+            missing = [name for name in columns if name not in field_names]
+            if missing:
+                print("Warning: Fields not found in layer: " + ", ".join(missing))
+            field_names = [name for name in field_names if name in columns]
+
+        # push filters and column selection down to ogr
+        if where:
+            layer.SetAttributeFilter(where)
+        if bbox is not None:
+            layer.SetSpatialFilterRect(*[float(b) for b in bbox])
+        ignored = [layer_definition.GetFieldDefn(i).GetName() for i in range(layer_definition.GetFieldCount())
+                   if layer_definition.GetFieldDefn(i).GetName() not in field_names]
+        if geometry is None:
+            ignored.append("OGR_GEOMETRY")
+        layer.SetIgnoredFields(ignored + ["OGR_STYLE"])
+
+        chunks = None
+        if hasattr(layer, "GetArrowStreamAsNumPy"):
+            try:
+                chunks = _read_arrow_chunks(layer, chunk_size, field_names, geometry)
+            except Exception:
+                chunks = None
+        if chunks is None:
+            chunks = _read_feature_chunks(layer, chunk_size, field_names, geometry)
+        for chunk in chunks:
+            if geometry == "coords":
+                chunk.update(_wkb2coords(chunk.pop("geometry")))
+            yield chunk
+    finally:
+        data_source = None
+
+
+def zip2vsi(zip_file_dir, shp_name=None):
+    """
+    Get the GDAL virtual file system path (/vsizip/) of a shapefile in a zip file
+    :param zip_file_dir: STR of the zip file directory
+    :param shp_name: [optional] STR of the shapefile name in the zip file (default: first .shp file)
+    :output: STR of the /vsizip/ path
+    """
+    if not shp_name:
+        with zipfile.ZipFile(zip_file_dir) as zf:
+            shp_names = [name for name in zf.namelist() if name.lower().endswith(".shp")]
+        if not shp_names:
+            raise ValueError("No shapefile in " + str(zip_file_dir))
+        shp_name = shp_names[0]
+    return "/vsizip/" + os.path.abspath(zip_file_dir).replace("\\", "/") + "/" + shp_name
+
+
+def _read_arrow_chunks(layer, chunk_size, field_names, geometry):
+    # returns a generator of DICT chunks from the columnar Arrow stream of ogr (GDAL >= 3.6)
+    # the stream is opened here, so that unsupported layers raise before the first chunk is read
+    stream = layer.GetArrowStreamAsNumPy(options=["MAX_FEATURES_IN_BATCH=%i" % int(chunk_size), "INCLUDE_FID=YES"])
+    if stream is None:
+        raise RuntimeError("Arrow stream not available")
+    fid_name = layer.GetFIDColumn() or "OGC_FID"
+    geometry_name = layer.GetGeometryColumn() or "wkb_geometry"
+
+    def arrow_chunk(batch):
+        chunk = {"fid": np.asarray(batch[fid_name], dtype=np.int64)}
+        if geometry is not None:
+            chunk["geometry"] = np.asarray(batch[geometry_name], dtype=object)
+        for name in field_names:
+            chunk[name] = np.asarray(batch[name])
+        return chunk
+
+    return (arrow_chunk(batch) for batch in stream)
+
+
+def _read_feature_chunks(layer, chunk_size, field_names, geometry):
+    # yields DICT chunks feature by feature (ogr versions without Arrow stream)
+    layer_definition = layer.GetLayerDefn()
+    field_indices = [layer_definition.GetFieldIndex(name) for name in field_names]
+    layer.ResetReading()
+    fids, wkbs, values = [], [], [[] for i in field_indices]
+    for feature in layer:
+        fids.append(feature.GetFID())
+        if geometry is not None:
+            geom = feature.GetGeometryRef()
+            wkbs.append(bytes(geom.ExportToIsoWkb()) if geom is not None else None)
+        for column, field_index in zip(values, field_indices):
+            column.append(feature.GetField(field_index))
+        if len(fids) == chunk_size:
+            yield _feature_chunk(fids, wkbs, values, field_names, geometry)
+            fids, wkbs, values = [], [], [[] for i in field_indices]
+    if fids:
+        yield _feature_chunk(fids, wkbs, values, field_names, geometry)
+
+
+def _feature_chunk(fids, wkbs, values, field_names, geometry):
+    chunk = {"fid": np.array(fids, dtype=np.int64)}
+    if geometry is not None:
+        chunk["geometry"] = np.empty(len(wkbs), dtype=object)
+        chunk["geometry"][:] = wkbs
+    for name, column in zip(field_names, values):
+        chunk[name] = np.array(column)
+    return chunk
+
+
+def _wkb2coords(wkbs):
+    # converts WKB geometries into flat x-y vertex arrays with part (ring or line) offsets
+    coords, part_offsets, feature_parts = [], [0], [0]
+    n_vertices = 0
+    for wkb in wkbs:
+        parts = []
+        if wkb is not None:
+            wkb = bytes(wkb)
+            try:
+                _collect_parts(wkb, 0, parts)
+            except (ValueError, struct.error):
+                # curved or otherwise unsupported geometry types: linearize with ogr
+                parts = []
+                _collect_parts(bytes(ogr.CreateGeometryFromWkb(wkb).GetLinearGeometry().ExportToIsoWkb()), 0, parts)
+        for part in parts:
+            coords.append(part)
+            n_vertices += part.shape[0]
+            part_offsets.append(n_vertices)
+        feature_parts.append(len(part_offsets) - 1)
+    return {"coords": np.concatenate(coords) if coords else np.zeros((0, 2)),
+            "part_offsets": np.array(part_offsets, dtype=np.int64),
+            "feature_parts": np.array(feature_parts, dtype=np.int64)}
+
+
+def _collect_parts(wkb, offset, parts):
+    # appends NUMPY ARRAYS (n, 2) of the x-y coordinates of all points, lines, and rings of the WKB (ISO, EWKB,
+    # or 25D) geometry starting at offset to parts and returns the offset of the next geometry
+    byte_order = "<" if wkb[offset] == 1 else ">"
+    code = struct.unpack_from(byte_order + "I", wkb, offset + 1)[0]
+    offset += 5
+    if code & 0x20000000:  # EWKB with SRID
+        offset += 4
+    has_z = bool(code & 0x80000000) or (code & 0xffff) // 1000 in (1, 3)
+    has_m = bool(code & 0x40000000) or (code & 0xffff) // 1000 in (2, 3)
+    geometry_type = (code & 0xffff) % 1000
+    n_dims = 2 + has_z + has_m
+    dtype = np.dtype(byte_order + "f8")
+    if geometry_type == 1:  # point (empty points have NaN coordinates)
+        xy = _wkb_xy(wkb, offset, 1, n_dims, dtype)
+        if not np.isnan(xy).all():
+            parts.append(xy)
+        return offset + 8 * n_dims
+    n_items = struct.unpack_from(byte_order + "I", wkb, offset)[0]
+    offset += 4
+    if geometry_type == 2:  # line
+        parts.append(_wkb_xy(wkb, offset, n_items, n_dims, dtype))
+        return offset + 8 * n_dims * n_items
+    if geometry_type == 3:  # polygon rings
+        for i in range(n_items):
+            n_points = struct.unpack_from(byte_order + "I", wkb, offset)[0]
+            offset += 4
+            parts.append(_wkb_xy(wkb, offset, n_points, n_dims, dtype))
+            offset += 8 * n_dims * n_points
+        return offset
+    if geometry_type in (4, 5, 6, 7):  # multi-geometries and geometry collections
+        for i in range(n_items):
+            offset = _collect_parts(wkb, offset, parts)
+        return offset
+    raise ValueError("Unsupported WKB geometry type %i" % code)
+
+
+def _wkb_xy(wkb, offset, n_points, n_dims, dtype):
+    # returns NUMPY ARRAY (n_points, 2) of the x-y coordinates of a WKB point sequence (without per-vertex calls)
+    return np.frombuffer(wkb, dtype, n_points * n_dims, offset).reshape(-1, n_dims)[:, :2].astype(float, copy=False)
+
+
+def get_esriwkt(epsg, online=False):
+    """
+    Get esriwkt-formatted spatial references (.prj file format) with epsg code from the local projection cache
     Usage: get_esriwkt(4326)
     :param epsg: Int of epsg
+    :param online: [optional] BOOL - if True, spatialreference.org is queried for codes that osr does not know
     :output: str containing esriwkt (if error: default epsg=4326 is used)
     """
+    try:
+        return lookup_wkt(epsg, "esriwkt", pretty=False)
+    except Exception:
+        if not online:
+            print("ERROR: Could not find epsg code {0} in osr. Returning default WKT(epsg=4326).".format(str(epsg)))
+            return WGS84_ESRIWKT
     try:
         with urllib.request.urlopen("http://spatialreference.org/ref/epsg/{0}/esriwkt/".format(epsg)) as response:
             return str(response.read()).strip("b").strip("'")
@@ -61,26 +453,110 @@ def get_esriwkt(epsg):
         # for example EPSG:3857 = SR-ORG:6864 -> https://spatialreference.org/ref/sr-org/6864/esriwkt/ = EPSG:3857
     except Exception:
         print("ERROR: Could not find epsg code on spatialreference.org. Returning default WKT(epsg=4326).")
-        return 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295],UNIT["Meter",1]]'
+        return WGS84_ESRIWKT
 
 
 def get_wkt(epsg, wkt_format="esriwkt"):
     """
-    Get WKT-formatted projection information for an epsg code using the osr library
+    Get WKT-formatted projection information for an epsg code from the local projection cache (filled with osr)
     :param epsg: Int of epsg
     :kwarg wkt_format: Str of wkt format (default is esriwkt for shapefile projections)
     :output: str containing WKT (if error: default epsg=4326 is used)
     """
-    default = 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295],UNIT["Meter",1]]'
-    spatial_ref = osr.SpatialReference()
     try:
-        spatial_ref.ImportFromEPSG(epsg)
-    except TypeError:
+        return lookup_wkt(epsg, wkt_format, pretty=True)
+    except (TypeError, ValueError):
         print("ERROR: epsg must be integer. Returning default WKT(epsg=4326).")
-        return default
     except Exception:
         print("ERROR: epsg number does not exist. Returning default WKT(epsg=4326).")
-        return default
+    return WGS84_ESRIWKT
+
+
+@functools.lru_cache(maxsize=1024)
+def lookup_wkt(epsg, wkt_format="esriwkt", pretty=True):
+    """
+    Get WKT of an epsg code from the in-process LRU cache, the on-disk store (WKT_CACHE_FILE), or osr (in that order)
+    Raises an exception if osr does not know the epsg code (errors are not cached).
+    :param epsg: Int of epsg
+    :param wkt_format: Str of wkt format ("esriwkt" or "wkt")
+    :param pretty: BOOL - if True, the WKT is formatted with ExportToPrettyWkt, otherwise in one line (ExportToWkt)
+    :output: str containing WKT
+    """
+    store = _load_wkt_store()
+    key = _wkt_key(epsg, wkt_format, pretty)
+    if key not in store:
+        store[key] = _osr_wkt(epsg, wkt_format, pretty)
+        save_wkt_store()
+    return store[key]
+
+
+def preload_wkt(epsg_codes, wkt_formats=("esriwkt",)):
+    """
+    Fill the on-disk projection store with a list of epsg codes (for example, before going offline)
+    Usage: preload_wkt([4326, 3857, 25832])
+    :param epsg_codes: LIST of Int epsg codes
+    :param wkt_formats: [optional] LIST of Str wkt formats
+    :output: LIST of epsg codes that osr does not know
+    """
+    store = _load_wkt_store()
+    failed = []
+    for epsg in epsg_codes:
+        for wkt_format in wkt_formats:
+            for pretty in (True, False):
+                key = _wkt_key(epsg, wkt_format, pretty)
+                if key in store:
+                    continue
+                try:
+                    store[key] = _osr_wkt(epsg, wkt_format, pretty)
+                except Exception:
+                    if epsg not in failed:
+                        failed.append(epsg)
+    save_wkt_store()
+    if failed:
+        print("WARNING: osr does not know the epsg codes: " + ", ".join([str(e) for e in failed]))
+    return failed
+
+
+def save_wkt_store():
+    """
+    Write the projection store to WKT_CACHE_FILE (atomic replace)
+    """
+    if _WKT_STORE is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(WKT_CACHE_FILE), exist_ok=True)
+        tmp_file = WKT_CACHE_FILE + ".tmp" + str(os.getpid())
+        with open(tmp_file, "w") as f:
+            json.dump(_WKT_STORE, f)
+        os.replace(tmp_file, WKT_CACHE_FILE)
+    except OSError as problem:
+        print("WARNING: Could not save projection cache to " + WKT_CACHE_FILE)
+        print(problem)
+
+
+def _load_wkt_store():
+    # returns DICT of the on-disk store (read once per process)
+    global _WKT_STORE
+    if _WKT_STORE is None:
+        try:
+            with open(WKT_CACHE_FILE) as f:
+                _WKT_STORE = json.load(f)
+        except (OSError, ValueError):
+            _WKT_STORE = {}
+    return _WKT_STORE
+
+
+def _osr_wkt(epsg, wkt_format, pretty):
+    # builds WKT of an epsg code with the local PROJ database of osr (no network access)
+    spatial_ref = osr.SpatialReference()
+    if spatial_ref.ImportFromEPSG(int(epsg)) != 0:
+        raise RuntimeError("epsg number does not exist: " + str(epsg))
     if wkt_format == "esriwkt":
         spatial_ref.MorphToESRI()
-    return spatial_ref.ExportToPrettyWkt()
+    if pretty:
+        return spatial_ref.ExportToPrettyWkt()
+    return spatial_ref.ExportToWkt()
+
+
+def _wkt_key(epsg, wkt_format, pretty):
+    return "{0}:{1}:{2}".format(int(epsg), wkt_format, "pretty" if pretty else "compact")
@@ -0,0 +1,271 @@
+"""
+Spatial index for classifying many points by the polygons that contain them (for example, slackwater polygons)
+
+The polygon bounding boxes are packed once into an R-tree (Sort-Tile-Recursive leaf order) that can be saved to and
+loaded from disk. Batches of points (NumPy arrays) walk down the tree level by level and the remaining candidates are
+tested exactly with vectorized even-odd ray casting (holes and multipolygons are supported).
+
+Usage example:
+    index = PolygonIndex.from_file("slackwater-poly.zip")
+    index.save("slackwater-index.npz")
+    index = PolygonIndex.load("slackwater-index.npz")
+    polygon_ids = index.query(x, y)  # -1 where no polygon contains the point
+"""
+import os, sys
+import numpy as np
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))  # shp_control (see PolygonIndex.from_file)
+
+
+class PolygonIndex:
+    def __init__(self, coords, part_offsets, feature_parts, ids=None, node_size=8):
+        """
+        Build the R-tree of polygon bounding boxes
+        :param coords: NUMPY ARRAY of shape (n_vertices, 2) with the x-y coordinates of all rings
+        :param part_offsets: NUMPY ARRAY of n_rings + 1 start indices of every ring in coords
+        :param feature_parts: NUMPY ARRAY of n_polygons + 1 start indices of every polygon in part_offsets
+                              (same structure as shp_control.read_features(geometry="coords"))
+        :param ids: [optional] NUMPY ARRAY of n_polygons polygon IDs (default: 0, 1, ..., n_polygons - 1) - integer
+                    IDs are stored as int64, other IDs (for example, names) as strings
+        :param node_size: [optional] INT number of children per tree node
+        """
+        self.coords = np.ascontiguousarray(coords, dtype=float).reshape(-1, 2)
+        self.part_offsets = np.asarray(part_offsets, dtype=np.int64)
+        self.feature_parts = np.asarray(feature_parts, dtype=np.int64)
+        n_polygons = self.feature_parts.size - 1
+        if ids is None:
+            self.ids = np.arange(n_polygons, dtype=np.int64)
+        else:
+            ids = np.asarray(ids)
+            self.ids = ids.astype(np.int64) if ids.dtype.kind in "iub" else ids.astype(str)
+        self.node_size = int(node_size)
+        self.set_edges()
+        self.levels = []  # LIST of arrays (4, n_nodes) of x_min, y_min, x_max, y_max from the leaves to the top level
+        self.child_starts = []  # LIST of first child indices (in the level below) of the nodes of levels 1, 2, ...
+        self.child_counts = []  # LIST of numbers of children of the nodes of levels 1, 2, ...
+        self.order = np.zeros(0, dtype=np.int64)  # polygon indices in leaf order
+        if n_polygons:
+            self.build()
+
+    @classmethod
+    def from_file(cls, file_dir, id_field=None, **kwargs):
+        """
+        Build the index from a polygon layer (.zip with shapefile, .shp, .gpkg, .fgb - see shp_control.read_features)
+        :param file_dir: STR of the polygon file directory
+        :param id_field: [optional] STR of a field with polygon IDs (default: feature IDs)
+        :kwarg node_size: [optional] INT number of children per tree node
+        :kwarg where, bbox, layer, shp_name: [optional] passed to shp_control.read_features
+        :output: PolygonIndex
+        """
+        from shp_control import read_features  # requires gdal (not needed for loading saved indexes)
+        node_size = kwargs.pop("node_size", 8)
+        columns = [id_field] if id_field else []
+        coords, part_offsets, feature_parts, ids = [], [np.zeros(1, dtype=np.int64)], [np.zeros(1, dtype=np.int64)], []
+        n_vertices = n_parts = 0
+        for chunk in read_features(file_dir, columns=columns, geometry="coords", **kwargs):
+            coords.append(chunk["coords"])
+            part_offsets.append(chunk["part_offsets"][1:] + n_vertices)
+            feature_parts.append(chunk["feature_parts"][1:] + n_parts)
+            ids.append(chunk[id_field] if id_field else chunk["fid"])
+            n_vertices += chunk["coords"].shape[0]
+            n_parts += chunk["part_offsets"].size - 1
+        if not ids:
+            print("Warning: No polygons read from " + str(file_dir))
+            return cls(np.zeros((0, 2)), [0], [0], node_size=node_size)
+        return cls(np.concatenate(coords), np.concatenate(part_offsets), np.concatenate(feature_parts),
+                   np.concatenate(ids), node_size=node_size)
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        Load an index saved with save (the tree is not rebuilt)
+        :param file_name: STR of the .npz file directory
+        :output: PolygonIndex
+        """
+        with np.load(file_name) as data:
+            index = cls.__new__(cls)
+            index.coords = data["coords"]
+            index.part_offsets = data["part_offsets"]
+            index.feature_parts = data["feature_parts"]
+            index.ids = data["ids"]
+            index.node_size = int(data["node_size"])
+            index.order = data["order"]
+            index.levels = [data["level_%i" % i] for i in range(int(data["n_levels"]))]
+            index.child_starts = [data["child_start_%i" % i] for i in range(1, int(data["n_levels"]))]
+            index.child_counts = [data["child_count_%i" % i] for i in range(1, int(data["n_levels"]))]
+        index.set_edges()
+        return index
+
+    def build(self):
+        """
+        Pack the polygon bounding boxes bottom-up into the R-tree (Sort-Tile-Recursive): the nodes of every level are
+        sorted into vertical slices by x and within every slice by y, and every node_size consecutive nodes form one
+        parent node
+        """
+        boxes = self.get_bounding_boxes()
+        self.order = str_order(boxes, self.node_size)
+        level = boxes[self.order]
+        # rows of x_min, y_min, x_max, y_max are gathered much faster than columns of (n_nodes, 4) arrays
+        self.levels, self.child_starts, self.child_counts = [np.ascontiguousarray(level.T)], [], []
+        while level.shape[0] > self.node_size:
+            starts = np.arange(0, level.shape[0], self.node_size)
+            # empty polygons (NaN boxes) are ignored by fmin / fmax
+            parents = np.column_stack((np.fmin.reduceat(level[:, 0], starts),
+                                       np.fmin.reduceat(level[:, 1], starts),
+                                       np.fmax.reduceat(level[:, 2], starts),
+                                       np.fmax.reduceat(level[:, 3], starts)))
+            counts = np.diff(np.append(starts, level.shape[0]))
+            order = str_order(parents, self.node_size)
+            level = parents[order]
+            self.levels.append(np.ascontiguousarray(level.T))
+            self.child_starts.append(starts[order])
+            self.child_counts.append(counts[order])
+
+    def get_bounding_boxes(self):
+        """
+        :output: NUMPY ARRAY of shape (n_polygons, 4) with x_min, y_min, x_max, y_max of every polygon
+        """
+        vertex_starts = self.part_offsets[self.feature_parts[:-1]]
+        boxes = np.full((self.feature_parts.size - 1, 4), np.nan)
+        has_vertices = vertex_starts < self.part_offsets[self.feature_parts[1:]]
+        if self.coords.shape[0]:
+            starts = vertex_starts[has_vertices]
+            boxes[has_vertices, :2] = np.column_stack((np.minimum.reduceat(self.coords[:, 0], starts),
+                                                       np.minimum.reduceat(self.coords[:, 1], starts)))
+            boxes[has_vertices, 2:] = np.column_stack((np.maximum.reduceat(self.coords[:, 0], starts),
+                                                       np.maximum.reduceat(self.coords[:, 1], starts)))
+        return boxes
+
+    def query(self, x, y, batch_size=100000, max_edge_tests=5000000):
+        """
+        Find the polygon that contains every point (points on polygon edges may be assigned to either side)
+        :param x: NUMPY ARRAY of point x coordinates
+        :param y: NUMPY ARRAY of point y coordinates
+        :param batch_size: [optional] INT number of points per tree walk (limits memory)
+        :param max_edge_tests: [optional] INT maximum number of point-edge tests per vectorized step (limits memory)
+        :output: NUMPY ARRAY of polygon IDs (the first polygon if several contain the point) - if no polygon contains
+                 the point: -1 (integer IDs) or None (object array of string IDs)
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        polygons_found = np.full(x.size, -1, dtype=np.int64)  # polygon indices
+        if self.levels:
+            self._query_polygons(x, y, polygons_found, batch_size, max_edge_tests)
+        if self.ids.dtype.kind == "i":
+            result = np.full(x.size, -1, dtype=np.int64)
+        else:
+            result = np.full(x.size, None, dtype=object)
+        found = polygons_found >= 0
+        result[found] = self.ids[polygons_found[found]]
+        return result
+
+    def _query_polygons(self, x, y, polygons_found, batch_size, max_edge_tests):
+        # writes the index of the first polygon that contains every point to polygons_found (see query)
+        for start in range(0, x.size, batch_size):
+            bx, by = x[start:start + batch_size], y[start:start + batch_size]
+            points, polygons = self.query_candidates(bx, by)
+            inside = self.contains(points, polygons, bx, by, max_edge_tests)
+            first = np.full(bx.size, self.ids.size, dtype=np.int64)
+            np.minimum.at(first, points[inside], polygons[inside])
+            found = first < self.ids.size
+            polygons_found[start:start + batch_size][found] = first[found]
+
+    def query_candidates(self, x, y):
+        """
+        Walk down the tree with all points at once
+        :param x: NUMPY ARRAY of point x coordinates
+        :param y: NUMPY ARRAY of point y coordinates
+        :output: TUPLE of NUMPY ARRAYS (point indices, polygon indices) of all points inside polygon bounding boxes
+        """
+        # start with all nodes of the top level (children of the root)
+        n_top = self.levels[-1].shape[1]
+        points = np.repeat(np.arange(x.size, dtype=np.int64), n_top)
+        nodes = np.tile(np.arange(n_top, dtype=np.int64), x.size)
+        for level_no in range(len(self.levels) - 1, -1, -1):
+            if level_no < len(self.levels) - 1:
+                # replace the nodes of the level above with their children
+                starts = self.child_starts[level_no][nodes]
+                counts = self.child_counts[level_no][nodes]
+                pairs = np.repeat(np.arange(nodes.size), counts)
+                nodes = starts[pairs] + np.arange(pairs.size) - np.repeat(np.cumsum(counts) - counts, counts)
+                points = points[pairs]
+            x_min, y_min, x_max, y_max = self.levels[level_no]
+            px, py = x[points], y[points]
+            # NaN boxes (empty polygons) fail all comparisons
+            keep = (px >= x_min[nodes]) & (px <= x_max[nodes]) & (py >= y_min[nodes]) & (py <= y_max[nodes])
+            points, nodes = points[keep], nodes[keep]
+        return points, self.order[nodes]
+
+    def contains(self, points, polygons, x, y, max_edge_tests=5000000):
+        """
+        Exact even-odd ray casting test of point-polygon pairs
+        :param points: NUMPY ARRAY of point indices
+        :param polygons: NUMPY ARRAY of polygon indices (same size as points)
+        :param x: NUMPY ARRAY of point x coordinates
+        :param y: NUMPY ARRAY of point y coordinates
+        :param max_edge_tests: [optional] INT maximum number of point-edge tests per vectorized step
+        :output: NUMPY ARRAY of BOOL (True if the polygon contains the point)
+        """
+        inside = np.zeros(points.size, dtype=bool)
+        edge_starts = self.edge_offsets[polygons]
+        edge_counts = self.edge_offsets[polygons + 1] - edge_starts
+        cumulative = np.cumsum(edge_counts)
+        start = 0
+        while start < points.size:
+            # pairs [start, end) with at most max_edge_tests edges (at least one pair)
+            limit = (cumulative[start - 1] if start else 0) + max_edge_tests
+            end = max(int(np.searchsorted(cumulative, limit, side="right")), start + 1)
+            counts = edge_counts[start:end]
+            pairs = np.repeat(np.arange(start, end), counts)
+            # edge index = first edge of the polygon + position of the edge within the polygon
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            edges = edge_starts[pairs] + np.arange(pairs.size) - first
+            px, py = x[points[pairs]], y[points[pairs]]
+            x1, y1, x2, y2 = self.edges[0][edges], self.edges[1][edges], self.edges[2][edges], self.edges[3][edges]
+            straddles = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing = straddles & (px < (x2 - x1) * (py - y1) / (y2 - y1) + x1)
+            inside[start:end] = np.bincount(pairs - start, weights=crossing, minlength=end - start) % 2 == 1
+            start = end
+        return inside
+
+    def save(self, file_name):
+        """
+        Save polygons and tree to a .npz file (see load)
+        :param file_name: STR of the .npz file directory
+        """
+        levels = {"level_%i" % i: level for i, level in enumerate(self.levels)}
+        levels.update({"child_start_%i" % (i + 1): starts for i, starts in enumerate(self.child_starts)})
+        levels.update({"child_count_%i" % (i + 1): counts for i, counts in enumerate(self.child_counts)})
+        np.savez(file_name, coords=self.coords, part_offsets=self.part_offsets, feature_parts=self.feature_parts,
+                 ids=self.ids, node_size=self.node_size, order=self.order, n_levels=len(self.levels), **levels)
+
+    def set_edges(self):
+        """
+        Derive the ring edges (rows x1, y1, x2, y2) of all polygons: one edge per vertex to the next vertex of the ring
+        (the last vertex connects to the first - a zero-length edge for closed rings)
+        """
+        next_vertex = np.arange(1, self.coords.shape[0] + 1)
+        not_empty = self.part_offsets[1:] > self.part_offsets[:-1]
+        next_vertex[self.part_offsets[1:][not_empty] - 1] = self.part_offsets[:-1][not_empty]
+        self.edges = np.ascontiguousarray(np.vstack((self.coords.T, self.coords[next_vertex].T)))
+        self.edge_offsets = self.part_offsets[self.feature_parts]
+
+    def __call__(self):
+        print("Class Info: <type> = PolygonIndex (%i polygons, %i tree levels)" % (self.ids.size, len(self.levels)))
+
+
+def str_order(boxes, node_size):
+    """
+    Sort-Tile-Recursive order of bounding boxes: vertical slices of about sqrt(n_nodes) * node_size boxes by x center,
+    and within every slice by y center
+    :param boxes: NUMPY ARRAY of shape (n, 4) with x_min, y_min, x_max, y_max
+    :param node_size: INT number of children per tree node
+    :output: NUMPY ARRAY of n box indices
+    """
+    n_boxes = boxes.shape[0]
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2.
+    n_nodes = int(np.ceil(n_boxes / node_size))
+    slice_size = max(int(np.ceil(np.sqrt(n_nodes))), 1) * node_size
+    order = np.argsort(centers[:, 0], kind="stable")
+    slice_no = np.arange(n_boxes) // slice_size
+    return order[np.lexsort((centers[order, 1], slice_no))]
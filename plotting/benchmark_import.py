@@ -0,0 +1,67 @@
+""" Import-time benchmark of plotter.py
+
+Measures in fresh interpreters how long "import plotter" plus "Plotter()" takes with the lazy matplotlib import,
+and compares it with the eager imports of matplotlib, pyplot, font_manager, and mplot3d that a plot triggers.
+
+Usage example:
+    python benchmark_import.py --repeat 10
+"""
+
+try:
+    import os
+    import sys
+    import json
+    import argparse
+    import statistics
+    import subprocess
+except Exception as problem:
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, json, argparse, statistics, subprocess).")
+    print(problem)
+
+CASES = {
+    "plotter_lazy": "import plotter; plotter.Plotter()",
+    "plotter_first_figure": "import plotter; p = plotter.Plotter(); p.create_figure()",
+    "matplotlib_eager": "import matplotlib, matplotlib.pyplot, matplotlib.font_manager; "
+                        "from mpl_toolkits.mplot3d import Axes3D; from matplotlib.ticker import FormatStrFormatter",
+}
+
+
+def time_statement(statement, repeat=5):
+    """ Time a statement in fresh interpreters (the module caches of the current process do not interfere)
+
+    :param str statement: python statement
+    :param int repeat: number of fresh interpreters
+    :return: list of float seconds
+    """
+    code = "import time; t = time.perf_counter(); {0}; print(time.perf_counter() - t)".format(statement)
+    env = dict(os.environ, MPLBACKEND="Agg")
+    seconds = []
+    for i in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.path.abspath(os.path.dirname(__file__)),
+                                env=env, capture_output=True, text=True, check=True).stdout
+        seconds.append(float(output.strip().splitlines()[-1]))
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of plotter.py")
+    parser.add_argument("--repeat", type=int, default=5, help="number of fresh interpreters per case")
+    parser.add_argument("--out", default="", help="JSON report file (default: print to stdout)")
+    args = parser.parse_args()
+
+    report = {}
+    for name, statement in CASES.items():
+        seconds = time_statement(statement, args.repeat)
+        report[name] = {"median_seconds": statistics.median(seconds), "seconds": seconds}
+        print(" * {0:<24} median: {1:.3f} s".format(name, report[name]["median_seconds"]), file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(" * Saved report as: " + args.out, file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,183 @@
 and not the best example.
 Comes with capacities for various x-y-plots, surface plots, heatmaps, and saving figures-
 
+matplotlib is imported with the first plot (see load_matplotlib). Without a display, the Agg backend is used.
+
 Usage example:
     plot_frame = Plotter()
     plot_frame.create_figure(dpi=600)
     x_data = np.arange(10)
     y_data = np.random.rand(1,10)
     plot_frame.make_x_y_plot(x_data, y_data)
-    plot_frame.save_figure(save_fig_dir="C:/temp/plots/example.png"):
+    plot_frame.save_figure(save_fig_dir="C:/temp/plots/example.png", formats=["png", "pdf"])
 
 """
 
 try:
     import os
+    import sys
+    import copy
+    import time
+    import shutil
+    import hashlib
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from fun import lru_store
 except Exception as problem:
-    print("ExceptionERROR: Missing fundamental packages (required: os).")
+    print("ExceptionERROR: Missing fundamental packages (required: os, sys, copy, time, shutil, hashlib, concurrent, fun.lru_store).")
     print(problem)
 
 try:
     import numpy as np
-    import matplotlib
-    import matplotlib.pyplot as plt
-    import matplotlib.font_manager as font_manager
-    from mpl_toolkits.mplot3d import Axes3D  # imports 3D projection
-    from matplotlib.ticker import LinearLocator, FormatStrFormatter
 except Exception as problem:
-    print("ExceptionERROR: Could not import matplotlib and/or numpy.")
+    print("ExceptionERROR: Could not import numpy.")
     print(problem)
 
+# file extensions of vector outputs (see Plotter.rasterize_dense_artists)
+VECTOR_FORMATS = (".pdf", ".svg", ".svgz", ".eps", ".ps")
+
+# matplotlib is imported with the first plot (see load_matplotlib)
+matplotlib = None
+plt = None
+font_manager = None
+LinearLocator = None
+FormatStrFormatter = None
+
+# resolved fonts shared by all Plotter instances {(name, weight, style, size): FontProperties}
+_FONT_CACHE = {}
+# [font settings, rcParams values] of the last update_fonts call (avoids repeated rcParams updates)
+_FONT_RC = [None, None]
+_FONT_RC_KEYS = ["font.family", "font.weight", "font.size", "font.style", "font.sans-serif", "font.serif"]
+
+
+def has_display():
+    """ Check if a display is available for interactive matplotlib backends
+
+    :return: bool (always True on Windows and macOS)
+    """
+    if sys.platform.startswith("win") or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def load_matplotlib(backend=None):
+    """ Import matplotlib on first use (a job that never plots does not pay for the import) and
+    select the non-interactive Agg backend if no display is available and no MPLBACKEND is set
+
+    :param str backend: [optional] matplotlib backend to enforce, e.g., "Agg"
+    :return: matplotlib.pyplot
+    """
+    global matplotlib, plt, font_manager, LinearLocator, FormatStrFormatter
+    if plt is not None and backend is None:
+        return plt
+    try:
+        import matplotlib
+        if backend:
+            matplotlib.use(backend, force=True)
+        elif not (os.environ.get("MPLBACKEND") or has_display()):
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import matplotlib.font_manager as font_manager
+        from mpl_toolkits.mplot3d import Axes3D  # imports 3D projection
+        from matplotlib.ticker import LinearLocator, FormatStrFormatter
+    except Exception as problem:
+        print("ExceptionERROR: Could not import matplotlib.")
+        print(problem)
+    return plt
+
+
+def _as_float(data):
+    """ Convert numeric, datetime64 or datetime.datetime data to a float array (for decimation arithmetic only)
+    """
+    data = np.asarray(data)
+    if data.dtype.kind == "O":  # for example, a list of datetime.datetime objects
+        try:
+            return data.astype(float)
+        except (TypeError, ValueError):
+            data = np.asarray(data, dtype="datetime64[ns]")
+    if data.dtype.kind == "M":
+        return data.astype("datetime64[ns]").astype(float)
+    return data.astype(float)
+
+
+def decimate_minmax(x_data, y_data, n_out):
+    """ Reduce a series to about n_out points keeping the minimum and maximum of every bucket
+    (peaks and troughs remain visible)
+
+    :param x_data: list or 1d array of x values (numeric, datetime64 or datetime.datetime)
+    :param y_data: list or 1d array of y values
+    :param int n_out: target number of points
+    :return: tuple of decimated (x_data, y_data) arrays
+    """
+    x_data = np.asarray(x_data)
+    y_data = np.asarray(y_data)
+    n = y_data.size
+    if n <= n_out or n_out < 4:
+        return x_data, y_data
+    bucket_size = int(np.ceil(n / (n_out // 2)))
+    n_buckets = int(np.ceil(n / bucket_size))
+    y_float = np.full(n_buckets * bucket_size, np.nan)
+    y_float[:n] = _as_float(y_data)
+    buckets = y_float.reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+    i_min = offsets + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    i_max = offsets + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    # keep the time order of minimum and maximum within every bucket
+    index = np.unique(np.concatenate(([0, n - 1], np.minimum(i_min, n - 1), np.minimum(i_max, n - 1))))
+    return x_data[index], y_data[index]
+
+
+def decimate_lttb(x_data, y_data, n_out):
+    """ Reduce a series to n_out points with the Largest-Triangle-Three-Buckets algorithm
+
+    :param x_data: list or 1d array of x values (numeric, datetime64 or datetime.datetime)
+    :param y_data: list or 1d array of y values
+    :param int n_out: target number of points
+    :return: tuple of decimated (x_data, y_data) arrays
+    """
+    x_data = np.asarray(x_data)
+    y_data = np.asarray(y_data)
+    n = y_data.size
+    if n <= n_out or n_out < 3:
+        return x_data, y_data
+    x = _as_float(x_data)
+    y = _as_float(y_data)
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    index = np.empty(n_out, dtype=int)
+    index[0], index[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        next_end = edges[b + 2] if b + 2 < edges.size else n
+        avg_x = np.nanmean(x[end:next_end])
+        avg_y = np.nanmean(y[end:next_end])
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.)))
+        index[b + 1] = a
+    return x_data[index], y_data[index]
+
+
+def count_vertices(artist):
+    """ Count the vertices (or points) of a line, scatter, contour, or mesh artist
+
+    :param artist: matplotlib artist
+    :return: int number of vertices (0 for other artists)
+    """
+    try:
+        if hasattr(artist, "get_xydata"):  # lines
+            return len(artist.get_xydata())
+        if hasattr(artist, "get_coordinates"):  # pcolormesh
+            return artist.get_coordinates().size // 2
+        if hasattr(artist, "get_offsets") and hasattr(artist, "get_paths"):  # scatter, contours
+            vertices = len(artist.get_offsets())
+            if vertices <= 1:
+                vertices = sum(len(path.vertices) for path in artist.get_paths())
+            return vertices
+    except Exception:
+        pass
+    return 0
+
 
 class Plotter:
     def __init__(self, *args):
@@ -38,14 +188,74 @@ class Plotter:
         
         self.set_default_parameters()
         self.dir = os.path.abspath(os.path.dirname(__file__)) + os.sep
+        self.batch = None  # DICT of figure, axe and artists in batch mode (see start_batch)
+        self.save_pool = None  # ThreadPoolExecutor of background saves (see save_figure)
+        self.save_futures = []  # pending background saves
+        self.render_stats = []  # LIST of per-plot stage timings if timing_active (see get_render_stats)
+
+    def batch_x_y_plot(self, x_data, y_data, save_fig_dir=None, **kwargs):
+        """ Swap the data of the batch figure (see start_batch) and optionally save it
+
+        :param (list) x_data: [x_series]
+        :param (nested list) y_data: [[y_series1], [y_series2], ... ] with as many series as in start_batch
+        :param str save_fig_dir: [optional] directory where to save the figure
+        :param kwargs:
+            plot_title = STR: title of this plot (only used if plot_title_mode is True)
+            x_label / y_label = STR: axis labels of this plot (default: keep current labels)
+        :return: -1 if fails
+        """
+        if not self.batch:
+            print("ERROR: Batch mode not active (call start_batch first).")
+            return -1
+        fig, axe = self.batch["fig"], self.batch["axe"]
+        start = self.stage_start()
+        self.new_render_record("batch_" + self.batch["plot_type"])
+
+        for artist, y in zip(self.batch["artists"], y_data):
+            try:
+                if self.batch["plot_type"] == "scatter":
+                    artist.set_offsets(np.column_stack((x_data, y)))
+                else:
+                    artist.set_data(x_data, y)
+            except Exception as problem:
+                print("ERROR: Could not update batch graph data.")
+                print(problem)
+                return -1
+
+        if not (self.x_lim_mode and self.y_lim_mode):
+            axe.relim()
+            if self.batch["plot_type"] == "scatter":
+                # relim only considers lines (not the offsets of scatter collections)
+                for artist in self.batch["artists"]:
+                    axe.update_datalim(artist.get_offsets())
+            axe.autoscale_view(scalex=not self.x_lim_mode, scaley=not self.y_lim_mode)
+
+        if kwargs.get("x_label") is not None:
+            axe.set_xlabel(kwargs.get("x_label"), **self.hfont)
+        if kwargs.get("y_label") is not None:
+            axe.set_ylabel(kwargs.get("y_label"), **self.hfont)
+        if self.plot_title_mode and kwargs.get("plot_title") is not None:
+            axe.set_title(kwargs.get("plot_title"))
+        self.record_artists(fig, start)
+
+        if save_fig_dir:
+            start = self.stage_start()
+            try:
+                fig.savefig(save_fig_dir, bbox_inches=self.fig_boxes)
+                self.record_stage("encode", start)
+                print(" * Saved figure as: " + save_fig_dir)
+            except Exception as problem:
+                print("WARNING: Could not save figure as path:\n  " + save_fig_dir)
+                print(problem)
 
     def create_figure(self):
         """
         :return: matplotlib.pyplot.figure
         """
+        start = self.stage_start()
         try:
             self.update_fonts()
-            return plt.figure(
+            fig = plt.figure(
                 figsize=(self.width, self.height),
                 dpi=self.resolution,
                 facecolor=self.face_color,
@@ -55,6 +265,26 @@ class Plotter:
             print("ERROR: Could not create figure.")
             print(problem)
             return -1
+        self.new_render_record()
+        self.record_stage("create_figure", start)
+        return fig
+
+    def get_render_stats(self):
+        """ Summarize the per-stage render times recorded with timing_active = True
+
+        Stages: create_figure, artists (make_* plot functions), setup_figure (ticks, limits, grid), layout (tight
+        bounding box in save_figure), and encode (file writing in save_figure)
+
+        :return: dict with
+            plots = list of dicts (one per plot) with plot_type, stages (dict of seconds), artists, and vertices
+            totals = dict of total seconds per stage
+            n_plots = int number of recorded plots
+        """
+        totals = {}
+        for record in self.render_stats:
+            for stage, seconds in record["stages"].items():
+                totals[stage] = totals.get(stage, 0.) + seconds
+        return {"plots": copy.deepcopy(self.render_stats), "totals": totals, "n_plots": len(self.render_stats)}
 
     def get_color_map(self, plot_data_size):
         """ Create a colormap of size plot_data_size
@@ -62,6 +292,7 @@ class Plotter:
         :param plot_data_size: INT (for x-y plot - the number of y-graphs, for surface plots: size(Z) elements)
         :return: matplotlib.pyplot.cm.get_cmap)
         """
+        load_matplotlib()
 
         try:
             return plt.cm.get_cmap(self.color_map_type, plot_data_size + 1)  # +1 because lowest color is nearby white
@@ -78,6 +309,8 @@ class Plotter:
             valfmt="{x:.2f}",
             textcolors=["black", "white"],
             threshold=None,
+            fast=True,
+            thin=True,
             **textkw
     ):
         """ Annotate a heatmap function from matplotlib.org
@@ -95,6 +328,12 @@ class Plotter:
             threshold  : Value in data units according to which the colors from
                          textcolors are applied. If None (the default) uses the
                          middle of the colormap as separation.
+            fast       : If True (default), normalization, text colors and labels are
+                         computed for the whole array at once.
+            thin       : If True (default, only with fast=True), only every n-th cell is
+                         annotated where labels do not fit into the cells at the figure dpi,
+                         and annotations are skipped where cells are smaller than
+                         heatmap_min_label_px.
         """
 
         if not isinstance(data, (list, np.ndarray)):
@@ -110,6 +349,9 @@ class Plotter:
         kw = dict(horizontalalignment="center", verticalalignment="center")
         kw.update(textkw)
 
+        if fast:
+            return self.annotate_heatmap_fast(im, data, valfmt, textcolors, threshold, thin, kw)
+
         # Get the formatter in case a string is supplied
         if isinstance(valfmt, str):
             valfmt = matplotlib.ticker.StrMethodFormatter(valfmt)
@@ -127,6 +369,68 @@ class Plotter:
                     print(problem)
         return texts
 
+    def annotate_heatmap_fast(self, im, data, valfmt, textcolors, threshold, thin, kw):
+        """ Vectorized heatmap annotation (see annotate_heatmap)
+
+        :return: list of matplotlib.text.Text
+        """
+        values = np.ma.getdata(data)
+        # one vectorized normalization for all cells instead of one im.norm call per cell
+        color_index = (np.ma.filled(im.norm(data), 0.) > threshold).astype(int)
+
+        step = 1
+        if thin:
+            step = self.get_heatmap_label_step(im, values, valfmt, kw)
+            if step < 1:
+                print("WARNING: Heatmap cells too small for legible annotations (annotations skipped).")
+                return []
+            if step > 1:
+                print("WARNING: Heatmap annotations thinned to every %i. cell." % step)
+        rows = np.arange(0, values.shape[0], step)
+        cols = np.arange(0, values.shape[1], step)
+        sub_values = values[np.ix_(rows, cols)]
+        sub_colors = color_index[np.ix_(rows, cols)]
+
+        # pre-format all labels in bulk
+        if isinstance(valfmt, str):
+            labels = [valfmt.format(x=v) for v in sub_values.ravel().tolist()]
+        else:
+            labels = [valfmt(v, None) for v in sub_values.ravel().tolist()]
+
+        texts = []
+        axe = im.axes
+        jj, ii = np.meshgrid(cols, rows)
+        for i, j, label, c in zip(ii.ravel().tolist(), jj.ravel().tolist(), labels, sub_colors.ravel().tolist()):
+            texts.append(axe.text(j, i, label, color=textcolors[c], **kw))
+        return texts
+
+    def get_heatmap_label_step(self, im, values, valfmt, kw):
+        """ Estimate which n-th heatmap cell can be annotated legibly at the current figure dpi
+
+        :return: int step (1 = annotate all cells, 0 = cells too small for any annotation)
+        """
+        try:
+            fig = im.axes.figure
+            im.axes.apply_aspect()  # heatmaps use equal aspect ratios that shrink the axes
+            extent = im.axes.get_window_extent()
+            cell_width = extent.width / values.shape[1]
+            cell_height = extent.height / values.shape[0]
+            font_size = kw.get("fontsize", kw.get("size", matplotlib.rcParams["font.size"]))
+            font_px = float(font_size) * fig.dpi / 72.
+        except Exception:
+            return 1
+        if min(cell_width, cell_height) < self.heatmap_min_label_px:
+            return 0
+        if isinstance(valfmt, str):
+            # label width estimate: average glyph width = 0.6 x font size
+            label_chars = max(len(valfmt.format(x=v)) for v in (values.min(), values.max()))
+        else:
+            label_chars = 6
+        # 1.2 x label size leaves some space between neighbouring labels
+        step_x = 1.2 * 0.6 * font_px * label_chars / cell_width
+        step_y = 1.2 * font_px / cell_height
+        return int(np.ceil(max(step_x, step_y, 1.)))
+
     def heatmap(self, data, row_labels, col_labels, ax=None, cbar_kw={}, cbarlabel="", **kwargs):
         """ Create a heatmap from a numpy array and two lists of labels (source: matplolib.org).
 
@@ -144,6 +448,7 @@ class Plotter:
                          :meth: matplotlib.Figure.colorbar.
             cbarlabel  : The label for the colorbar
         """
+        load_matplotlib()
         try:
             if not ax:
                 ax = plt.gca()
@@ -229,6 +534,65 @@ class Plotter:
 
         return im, cbar
 
+    def log_render_summary(self, reset=False):
+        """ Print the total, mean, and share of every render stage (see get_render_stats)
+
+        :param bool reset: clear the recorded render_stats after printing
+        """
+        stats = self.get_render_stats()
+        if not stats["n_plots"]:
+            print("WARNING: No render stats recorded (set timing_active = True).")
+            return
+        total = sum(stats["totals"].values()) or 1.
+        print(" * Render time of %i plots: %.3f s" % (stats["n_plots"], total))
+        for stage, seconds in sorted(stats["totals"].items(), key=lambda item: -item[1]):
+            print("   - {0:<14} {1:9.3f} s  {2:8.4f} s/plot  {3:5.1f} %".format(
+                stage, seconds, seconds / stats["n_plots"], 100. * seconds / total))
+        print("   - artists: %i, vertices: %i" % (sum(r["artists"] for r in stats["plots"]),
+                                                  sum(r["vertices"] for r in stats["plots"])))
+        if reset:
+            self.render_stats = []
+
+    def make_cached_plot(self, cache, save_fig_dir, kind="x_y", data=(), formats=None, **kwargs):
+        """ Make and save a plot (see make_plot) unless the cache holds the figure of the same data and style.
+        On cache hits, the cached files are linked (or copied) to save_fig_dir without rendering.
+
+        Usage example:
+            cache = RenderCache("C:/temp/plot_cache/")
+            plot_frame.make_cached_plot(cache, "C:/temp/plots/q.png", "x_y", (t, [q]), formats=["png", "pdf"],
+                                        plot_type="bar")
+
+        :param RenderCache cache: render cache
+        :param str save_fig_dir: directory where to save the figure (file name with extension)
+        :param str kind: plot function - "x_y", "surface", or "heatmap" (see make_plot)
+        :param tuple data: positional arguments of the plot function (see make_plot)
+        :param list formats: [optional] file extensions (see save_figure)
+        :param kwargs: keyword arguments of make_x_y_plot / make_surface_plot, e.g., plot_type="bar"
+        :return: tuple of (list of saved file paths, bool cache hit)
+        """
+        if formats:
+            stem = os.path.splitext(save_fig_dir)[0]
+            paths = [stem + "." + str(fmt).lstrip(".") for fmt in formats]
+        else:
+            paths = [save_fig_dir]
+        key = cache.plot_key(self, kind, data, kwargs)
+        if cache.fetch(key, paths):
+            print(" * Reused cached figure: " + ", ".join(paths))
+            return paths, True
+
+        os.makedirs(os.path.dirname(os.path.abspath(save_fig_dir)), exist_ok=True)
+        for path in paths:
+            # never write into files that are hard links of cached figures
+            if os.path.isfile(path):
+                os.remove(path)
+        if self.make_plot(kind, data, **kwargs) == -1:
+            return [], False
+        saved = self.save_figure(save_fig_dir, formats=formats)
+        plt.close()
+        if len(saved) == len(paths):
+            cache.store(key, saved)
+        return saved, False
+
     def make_heatmap(self, Z, x_labels, y_labels):
         """ Make a heatmap plot
         Read more at https://matplotlib.org/gallery/images_contours_and_fields/image_annotated_heatmap.html
@@ -238,6 +602,7 @@ class Plotter:
         :param y_labels: list of strings
         :return: -1 if failes
         """
+        start = self.stage_start()
         self.update_fonts()
         try:
             fig, axe = plt.subplots(
@@ -250,6 +615,9 @@ class Plotter:
             print("ERROR: Could not initiate figure.")
             print(problem)
             return -1
+        self.new_render_record("heatmap")
+        self.record_stage("create_figure", start)
+        start = self.stage_start()
         Z = np.array(Z)
 
         try:
@@ -262,16 +630,44 @@ class Plotter:
             print("ERROR: Could not create heatmap.")
             print(problem)
             return -1
+        self.record_artists(fig, start)
+
+    def make_plot(self, kind, data, **kwargs):
+        """ Make a plot with the plot function of a kind
+
+        Usage example:
+            plot_frame.make_plot("x_y", (x_data, y_data), plot_type="bar")
+            plot_frame.make_plot("surface", (x_data, y_data, Z), plot_type="contourf")
+
+        :param str kind: plot function - "x_y" (make_x_y_plot), "surface" (make_surface_plot), or "heatmap"
+        :param tuple data: positional arguments of make_x_y_plot (x_data, y_data),
+                           make_surface_plot (x_data, y_data, Z), or make_heatmap (Z, x_labels, y_labels)
+        :param kwargs: keyword arguments of make_x_y_plot / make_surface_plot, e.g., plot_type="bar"
+                       (heatmaps do not accept keyword arguments)
+        :return: -1 if fails
+        """
+        if kind == "x_y":
+            return self.make_x_y_plot(*data, **kwargs)
+        if kind == "surface":
+            return self.make_surface_plot(*data, **kwargs)
+        if kind == "heatmap":
+            if kwargs:
+                print("ERROR: make_heatmap does not accept keyword arguments: " + ", ".join(kwargs))
+                return -1
+            return self.make_heatmap(*data)
+        print("ERROR: Invalid plot kind (must be x_y, surface, or heatmap): " + str(kind))
+        return -1
 
     def make_surface_plot(self, x_data, y_data, Z, *args, **kwargs):
         """Make a surface plot of Z values on an x-y array
 
         :param x_data: list or 1d array of x coordinates
         :param y_data: list or 1d array of y coordindates
-        :param Z: NESTED LIST with size = (y_size, x_size) -- [y_size*[x_size elements]]
+        :param Z: NESTED LIST or 2d array (also numpy.memmap) with size = (y_size, x_size) -- [y_size*[x_size elements]]
         :param args:
         :param kwargs:
-              plot_type = STR: "surface", "scatter3D", "trisurf", "contour", "contourf", "pcolormesh", "streamplot"
+              plot_type = STR: "surface", "scatter3D", "trisurf", "contour", "contourf", "pcolormesh", "imshow",
+                          "streamplot"
               projection_type = STR: "2D" or "3D"
         :return:
         """
@@ -291,28 +687,52 @@ class Plotter:
             projection_type = "2D"
 
         fig = self.create_figure()
+        start = self.stage_start()
 
         try:
             if projection_type == "2D":
                 axe = fig.add_subplot(self.subplot_rows, self.subplot_cols, self.subplot_index)
             else:
-                axe = fig.gca(projection="3d")
+                axe = fig.add_subplot(self.subplot_rows, self.subplot_cols, self.subplot_index, projection="3d")
         except Exception as problem:
-            print("ERROR: Could not create axe (fig.gca(projection=3d) failed).")
+            print("ERROR: Could not create axe (add_subplot(projection=3d) failed).")
             print(problem)
             return -1
 
         color_map = self.get_color_map(Z.__len__())
 
-        try:
-            X, Y = np.meshgrid(x_data, y_data)
-        except Exception as problem:
-            print("ERROR: Could not create np.meshgrid with x_data and y_data.")
-            print(problem)
+        # np.asarray does not copy arrays (memory-mapped Z is read only where needed)
+        x_data = np.asarray(x_data)
+        y_data = np.asarray(y_data)
+        if not isinstance(Z, np.ndarray):
+            Z = np.asarray(Z)
+
+        # level of detail: reduce the grid to the resolution that the figure can show
+        if Z.ndim == 2 and x_data.ndim == 1 and y_data.ndim == 1:
+            if projection_type == "3D":
+                max_nx = max_ny = int(self.width * self.resolution / self.surface_lod_px)
+            else:
+                max_nx, max_ny = int(self.width * self.resolution), int(self.height * self.resolution)
+            x_data, y_data, Z = self.reduce_grid(x_data, y_data, Z, max_nx, max_ny)
+
+        # 2D plot types accept 1d coordinates (no meshgrid copies required)
+        regular_grid = self.is_regular_grid(x_data, y_data)
+        if projection_type == "3D" or (plot_type == "streamplot" and not regular_grid):
+            try:
+                X, Y = np.meshgrid(x_data, y_data)
+            except Exception as problem:
+                print("ERROR: Could not create np.meshgrid with x_data and y_data.")
+                print(problem)
+        else:
+            X, Y = x_data, y_data
+
+        if plot_type == "pcolormesh" and regular_grid and self.surface_fast_path:
+            plot_type = "imshow"
 
         try:
             if plot_type == "surface":  # verified
-                surf = axe.plot_surface(X, Y, Z, cmap=color_map, linewidth=self.data_line_width, antialiased=False)
+                surf = axe.plot_surface(X, Y, Z, cmap=color_map, linewidth=self.data_line_width, antialiased=False,
+                                        rstride=1, cstride=1)
             if plot_type == "contour":  # verified
                 surf = axe.contour(X, Y, Z, cmap=color_map, linewidths=self.data_line_width,
                                    linestyles=self.data_line_style[0], alpha=self.alpha_value, antialiased=False)
@@ -321,9 +741,21 @@ class Plotter:
                                     antialiased=False)
             if plot_type == "pcolormesh":  # not yet verified
                 surf = axe.pcolormesh(X, Y, Z, cmap=color_map, linewidth=self.data_line_width, antialiased=False,
-                                      alpha=self.alpha_value)
+                                      alpha=self.alpha_value, shading="auto")
+            if plot_type == "imshow":  # regular grids only
+                # ascending coordinates (descending extents would invert the axes, unlike pcolormesh)
+                if x_data[-1] < x_data[0]:
+                    x_data, Z = x_data[::-1], Z[:, ::-1]
+                if y_data[-1] < y_data[0]:
+                    y_data, Z = y_data[::-1], Z[::-1]
+                dx = (x_data[-1] - x_data[0]) / max(x_data.size - 1, 1) / 2.
+                dy = (y_data[-1] - y_data[0]) / max(y_data.size - 1, 1) / 2.
+                surf = axe.imshow(Z, cmap=color_map, alpha=self.alpha_value, origin="lower", aspect="auto",
+                                  interpolation="nearest",
+                                  extent=(x_data[0] - dx, x_data[-1] + dx, y_data[0] - dy, y_data[-1] + dy))
             if plot_type == "trisurf":  # not yet verified
-                surf = axe.plot_trisurf(X, Y, Z, cmap=color_map, linewidth=self.data_line_width)
+                surf = axe.plot_trisurf(X.ravel(), Y.ravel(), Z.ravel(), cmap=color_map,
+                                        linewidth=self.data_line_width)
             if plot_type == "scatter3D":  # not yet verified
                 surf = axe.scatter3D(X, Y, Z)
             if plot_type == "streamplot":  # plot vectors of velocities -- not yet verified
@@ -351,8 +783,53 @@ class Plotter:
         if self.legend_active:
             fig.colorbar(surf, shrink=self.colorbar_shrink, aspect=self.colorbar_aspect)
 
+        self.record_artists(fig, start, plot_type)
         self.setup_figure(fig, axe)
 
+    def is_regular_grid(self, x_data, y_data):
+        """ Check if 1d x and y coordinates are evenly spaced
+
+        :param x_data: 1d array of x coordinates
+        :param y_data: 1d array of y coordinates
+        :return: bool
+        """
+        for coords in (x_data, y_data):
+            if coords.ndim != 1 or coords.size < 2:
+                return False
+            steps = np.diff(coords.astype(float))
+            if not np.allclose(steps, steps[0], rtol=1e-6, atol=0.):
+                return False
+        return True
+
+    def reduce_grid(self, x_data, y_data, Z, max_nx, max_ny):
+        """ Level-of-detail reduction of a grid to at most max_nx by max_ny cells
+        with surface_lod_method "stride" (every n-th value) or "mean" (block averages)
+
+        :param x_data: 1d array of x coordinates
+        :param y_data: 1d array of y coordinates
+        :param Z: 2d array (or numpy.memmap) with size = (y_size, x_size)
+        :param int max_nx: maximum number of x cells
+        :param int max_ny: maximum number of y cells
+        :return: tuple of reduced (x_data, y_data, Z)
+        """
+        step_x = int(np.ceil(x_data.size / max(max_nx, 1)))
+        step_y = int(np.ceil(y_data.size / max(max_ny, 1)))
+        if step_x <= 1 and step_y <= 1:
+            return x_data, y_data, Z
+        if self.surface_lod_method != "mean":
+            # strided views only read the required values of memory-mapped arrays
+            return x_data[::step_x], y_data[::step_y], np.asarray(Z[::step_y, ::step_x])
+
+        nx, ny = x_data.size // step_x, y_data.size // step_y
+        Z_mean = np.empty((ny, nx))
+        for row in range(ny):
+            # block by block to keep memory bounded for memory-mapped Z
+            block = np.asarray(Z[row * step_y:(row + 1) * step_y, :nx * step_x], dtype=float)
+            Z_mean[row] = block.reshape(step_y, nx, step_x).mean(axis=(0, 2))
+        x_mean = x_data[:nx * step_x].reshape(nx, step_x).mean(axis=1)
+        y_mean = y_data[:ny * step_y].reshape(ny, step_y).mean(axis=1)
+        return x_mean, y_mean, Z_mean
+
     def make_x_y_plot(self, x_data, y_data, *args, **kwargs):
         """ plot y data against and x series
         :param (list) x_data: [x_series]
@@ -360,6 +837,8 @@ class Plotter:
         :param args:
         :param kwargs:
             plot_type = STR: "plot", "bar", "barh", "hist", "scatter"
+            decimation = STR: "minmax" or "lttb" reduces long "plot"/"scatter" series to about 2x the horizontal
+                         pixel count of the figure (default: self.decimation)
         :return:
         """
 
@@ -375,6 +854,7 @@ class Plotter:
             plot_type = "plot"
 
         fig = self.create_figure()
+        start = self.stage_start()
 
         try:
             axe = fig.add_subplot(self.subplot_rows, self.subplot_cols,
@@ -385,12 +865,20 @@ class Plotter:
             return -1
 
         color_map = self.get_color_map(y_data.__len__())
+        decimation = kwargs.get("decimation", self.decimation)
+        decimated_points = [0, 0]  # number of points [before, after] decimation
 
         graph_no = 0
         for y in y_data:
+            x_plot, y_plot = x_data, y
+            if decimation and plot_type in ["plot", "scatter"]:
+                x_plot, y_plot = self.decimate(x_data, y, decimation)
+                if len(y_plot) < len(y):
+                    decimated_points[0] += len(y)
+                    decimated_points[1] += len(y_plot)
             try:
                 if plot_type == "plot":  # verified
-                    axe.plot(x_data, y, linestyle=self.data_line_style[graph_no], color=color_map(graph_no + 1),
+                    axe.plot(x_plot, y_plot, linestyle=self.data_line_style[graph_no], color=color_map(graph_no + 1),
                              label=self.data_labels[graph_no])
                 if plot_type == "bar":  # not yet verified
                     axe.bar(x_data, y, color=self.bar_color, yerr=self.y_err_type, label=self.data_labels[graph_no])
@@ -399,10 +887,10 @@ class Plotter:
                 if plot_type == "hist":  # histogram -- not yet verified
                     axe.hist(x_data, self.hist_class_numbers)
                 if plot_type == "scatter":  # histogram -- not yet verified
-                    axe.scatter(x_data, y, color=color_map(graph_no + 1), label=self.data_labels[graph_no])
+                    axe.scatter(x_plot, y_plot, color=color_map(graph_no + 1), label=self.data_labels[graph_no])
             except:
                 try:
-                    axe.plot(x_data, y, linestyle="-", color=color_map(graph_no + 1), label="series" + str(graph_no))
+                    axe.plot(x_plot, y_plot, linestyle="-", color=color_map(graph_no + 1), label="series" + str(graph_no))
                     print(
                         "WARNING: Used default graph labels. Consider setting as many data_line_styles and data_labels as there are graphs.")
                 except Exception as problem:
@@ -410,6 +898,12 @@ class Plotter:
                     print(problem)
             graph_no += 1
 
+        if decimated_points[1]:
+            # visible indication of decimated graphs
+            axe.text(0.99, 0.01, "%s decimation: %i of %i points" % (decimation, decimated_points[1],
+                                                                    decimated_points[0]),
+                     transform=axe.transAxes, ha="right", va="bottom", fontsize=0.6 * self.font_size, alpha=0.7)
+
         # Labels
         try:
             axe.set_xlabel(self.x_label, **self.hfont)
@@ -422,22 +916,150 @@ class Plotter:
             axe.legend(loc=self.legend_loc, prop=self.font, facecolor=self.legend_face_color,
                        edgecolor=self.legend_edge_color, framealpha=self.legend_frame_alpha, fancybox=0)
 
+        self.record_artists(fig, start, plot_type)
         self.setup_figure(fig, axe)
 
-    def save_figure(self, save_fig_dir):
-        """ Save figure to disk
+    def decimate(self, x_data, y_data, method="minmax"):
+        """ Reduce a series to about 2x the horizontal pixel count of the figure (width * resolution)
 
-        :param matplotlib.pyplot.figure fig: instance of matplotlib.pyplot
-        :param str save_fig_dir: directory where to save the figure
-        :return:
+        :param x_data: list or 1d array of x values
+        :param y_data: list or 1d array of y values
+        :param str method: "minmax" or "lttb"
+        :return: tuple of (x_data, y_data) - unchanged if the series is short enough or the method is unknown
         """
+        n_out = int(2 * self.width * self.resolution)
         try:
-            plt.savefig(save_fig_dir, bbox_inches=self.fig_boxes)
-            print(" * Saved figure as: " + save_fig_dir)
-        except Exception as problem:
-            print("WARNING: Could not save figure as path:\n  " + save_fig_dir)
-            print("         Hint: .JPG is not supported (use .pdf or .png).")
+            if method == "minmax":
+                return decimate_minmax(x_data, y_data, n_out)
+            if method == "lttb":
+                return decimate_lttb(x_data, y_data, n_out)
+        except (TypeError, ValueError) as problem:
+            print("WARNING: Could not decimate the series (plotting all points).")
             print(problem)
+            return x_data, y_data
+        print("WARNING: Unknown decimation method %s (use minmax or lttb)." % str(method))
+        return x_data, y_data
+
+    def end_batch(self):
+        """ Close the batch figure (see start_batch)
+        """
+        if self.batch:
+            plt.close(self.batch["fig"])
+        self.batch = None
+
+    def save_figure(self, save_fig_dir, fig=None, formats=None, background=False, callback=None):
+        """ Save figure to disk in one or more formats from one render
+
+        Usage example:
+            plot_frame.make_x_y_plot(x_data, y_data)
+            plot_frame.save_figure("C:/temp/plots/example.png", formats=["png", "pdf"], background=True)
+            ... (next plots)
+            plot_frame.wait_for_saves()
+
+        :param str save_fig_dir: directory where to save the figure (file name with extension)
+        :param matplotlib.figure.Figure fig: [optional] figure to save (default: current pyplot figure)
+        :param list formats: [optional] file extensions, e.g., ["png", "pdf"] -- every format is saved with the
+                             file name of save_fig_dir (default: only the extension of save_fig_dir)
+        :param bool background: encode and write the files in a background thread (default: False);
+                                the figure is closed in pyplot and must not be modified afterwards
+        :param callback: [optional] function called with the list of saved file paths when saving is done
+        :return: list of saved file paths or, if background, a concurrent.futures.Future of that list
+        """
+        load_matplotlib()
+        if fig is None:
+            fig = plt.gcf()
+        if formats:
+            stem = os.path.splitext(save_fig_dir)[0]
+            paths = [stem + "." + str(fmt).lstrip(".") for fmt in formats]
+        else:
+            paths = [save_fig_dir]
+
+        if self.rasterize_threshold and any(os.path.splitext(path)[1].lower() in VECTOR_FORMATS for path in paths):
+            self.rasterize_dense_artists(fig)
+        bbox_inches = self.fig_boxes
+        start = self.stage_start()
+        if bbox_inches == "tight" and (len(paths) > 1 or start is not None):
+            # one layout pass for all formats instead of one per savefig call
+            try:
+                fig.canvas.draw()
+                bbox_inches = fig.get_tightbbox(fig.canvas.get_renderer()).padded(
+                    matplotlib.rcParams["savefig.pad_inches"])
+            except Exception:
+                bbox_inches = self.fig_boxes
+        self.record_stage("layout", start)
+        record = self.render_stats[-1] if self.timing_active and self.render_stats else None
+
+        if not background:
+            saved = self.write_figure(fig, paths, bbox_inches, record)
+            if callback:
+                callback(saved)
+            return saved
+
+        # detach the figure from pyplot so that the next plot does not draw on it
+        plt.close(fig)
+        if self.save_pool is None:
+            self.save_pool = ThreadPoolExecutor(max_workers=self.save_workers)
+        future = self.save_pool.submit(self.write_figure, fig, paths, bbox_inches, record)
+        if callback:
+            future.add_done_callback(lambda f: callback(f.result()) if not f.exception() else None)
+        self.save_futures = [f for f in self.save_futures if not f.done()] + [future]
+        return future
+
+    def new_render_record(self, plot_type=None):
+        """ Start the render_stats record of a new plot (only if timing_active)
+
+        :param str plot_type: [optional] plot type name
+        """
+        if self.timing_active:
+            self.render_stats.append({"plot_type": plot_type, "stages": {}, "artists": 0, "vertices": 0})
+
+    def rasterize_dense_artists(self, fig):
+        """ Rasterize artists with more than rasterize_threshold vertices in vector outputs (see VECTOR_FORMATS)
+        Raster outputs (png) are not affected. save_figure calls this only if rasterize_threshold is set
+        and a vector format is saved (the artists of fig remain rasterized).
+
+        :param matplotlib.figure.Figure fig: figure
+        :return: int number of rasterized artists
+        """
+        n_rasterized = 0
+        for axe in fig.axes:
+            for artist in axe.get_children():
+                if count_vertices(artist) > self.rasterize_threshold:
+                    artist.set_rasterized(True)
+                    n_rasterized += 1
+        return n_rasterized
+
+    def record_artists(self, fig, start, plot_type=None):
+        """ Record the artists stage with the number of artists and vertices of a figure (only if timing_active)
+
+        :param matplotlib.figure.Figure fig: figure
+        :param float start: stage start (see stage_start)
+        :param str plot_type: [optional] plot type name
+        """
+        if start is None:
+            return
+        self.record_stage("artists", start)
+        record = self.render_stats[-1]
+        if plot_type:
+            record["plot_type"] = plot_type
+        artists = [artist for axe in fig.axes for artist in axe.get_children()]
+        record["artists"] = len(artists)
+        record["vertices"] = sum(count_vertices(artist) for artist in artists)
+
+    def record_stage(self, stage, start, record=None):
+        """ Add the time since start to a stage of the current render_stats record
+
+        :param str stage: stage name
+        :param float start: stage start (see stage_start) - None does nothing
+        :param dict record: [optional] render_stats record (default: current plot)
+        """
+        if start is None:
+            return
+        if record is None:
+            if not self.render_stats:
+                self.new_render_record()
+            record = self.render_stats[-1]
+        record["stages"][stage] = record["stages"].get(stage, 0.) + time.perf_counter() - start
 
     def set_default_parameters(self):
         """ Instantiate font and style definitions
@@ -447,7 +1069,7 @@ class Plotter:
         self.font_size = 10.0
         self.font_style = "normal"
         self.font_weight = "medium"
-        self.update_fonts()
+        self.update_fonts(load=False)
         self.number_format = "%02f"
 
         # AXES DEFINITIONS
@@ -479,6 +1101,7 @@ class Plotter:
         self.data_labels = [""]  # list of strings
         self.data_line_style = ["-"]
         self.data_line_width = 0.5
+        self.decimation = None  # STR: None, "minmax", or "lttb" (reduce long x-y series before plotting)
         self.plot_title = "Title"
         self.plot_title_mode = False
 
@@ -504,7 +1127,10 @@ class Plotter:
         self.height = 4.0  # FLOAT defining inches
         self.resolution = 300  # INT defining dpi
         self.fig_boxes = "tight"  # or INT in inches
+        self.rasterize_threshold = None  # INT - artists with more vertices are rasterized in pdf/svg (e.g., 100000)
+        self.save_workers = 2  # INT - number of background threads of save_figure(background=True)
         self.show_fig = False
+        self.timing_active = False  # BOOL - record per-stage render times in render_stats (see get_render_stats)
 
         self.subplot_cols = 1
         self.subplot_rows = 1
@@ -526,9 +1152,13 @@ class Plotter:
         # PLOT SPECIFIC
         self.contour_interval_no = 10
         self.heatmap_annotation = ""  # STR of format: "{x:.1f} t"
+        self.heatmap_min_label_px = 3.0  # FLOAT - no annotations in heatmap cells smaller than this (pixels)
         self.hist_class_numbers = 10  # INT required for histogram plots
         self.stream_arrow_size = 2
         self.stream_arrow_style = "-|>"  # other options: ->, -, -[, <-, <->, <|-|>, ]-, ]-[, |-| (Bar)
+        self.surface_fast_path = True  # BOOL - pcolormesh of regular grids is drawn with imshow
+        self.surface_lod_method = "stride"  # STR: "stride" or "mean" (level-of-detail reduction of large grids)
+        self.surface_lod_px = 12  # FLOAT - minimum 3D surface cell size in pixels
 
     def setup_figure(self, fig, axe):
         """ Figure setup and rendering
@@ -536,6 +1166,7 @@ class Plotter:
         :param fig: instance of matplotlib.plt
         :param axe: instance of matplotlib.plt
         """
+        start = self.stage_start()
         # Ticks
         if self.x_tick_mode:
             try:
@@ -579,14 +1210,76 @@ class Plotter:
 
         if self.plot_title_mode:
             axe.set_title(self.plot_title)
+        self.record_stage("setup_figure", start)
 
         if self.show_fig:
             fig.show()
             plt.show()
 
-    def update_fonts(self):
+    def stage_start(self):
+        """ :return: float time.perf_counter() if timing_active, otherwise None (no timing overhead) """
+        return time.perf_counter() if self.timing_active else None
+
+    def start_batch(self, n_series=1, plot_type="plot"):
+        """ Build figure, axe and styling once for rendering many x-y plots with the same layout.
+        Every plot then only swaps the graph data with batch_x_y_plot.
+
+        Usage example:
+            plot_frame = Plotter()
+            plot_frame.start_batch(n_series=1)
+            for station, q in discharges.items():
+                plot_frame.batch_x_y_plot(time_steps, [q], save_fig_dir="C:/temp/plots/%s.png" % station)
+            plot_frame.end_batch()
+
+        :param int n_series: number of y-series per plot
+        :param str plot_type: "plot" or "scatter"
+        :return: -1 if fails
+        """
+        self.end_batch()
+        fig = self.create_figure()
+        start = self.stage_start()
+        try:
+            axe = fig.add_subplot(self.subplot_rows, self.subplot_cols, self.subplot_index)
+        except Exception as problem:
+            print("ERROR: Could not create axe (add_subplot failed).")
+            print(problem)
+            return -1
+
+        color_map = self.get_color_map(n_series)
+        artists = []
+        for graph_no in range(n_series):
+            try:
+                label = self.data_labels[graph_no]
+                line_style = self.data_line_style[graph_no]
+            except IndexError:
+                label = "series" + str(graph_no)
+                line_style = "-"
+            if plot_type == "scatter":
+                artists.append(axe.scatter([], [], color=color_map(graph_no + 1), label=label))
+            else:
+                artists.append(axe.plot([], [], linestyle=line_style, color=color_map(graph_no + 1), label=label)[0])
+
+        try:
+            axe.set_xlabel(self.x_label, **self.hfont)
+            axe.set_ylabel(self.y_label, **self.hfont)
+        except Exception as problem:
+            print("WARNING: Undefined x and/or y axis labels.")
+            print(problem)
+
+        if self.legend_active:
+            axe.legend(loc=self.legend_loc, prop=self.font, facecolor=self.legend_face_color,
+                       edgecolor=self.legend_edge_color, framealpha=self.legend_frame_alpha, fancybox=0)
+
+        self.record_artists(fig, start, "batch_setup")
+        self.setup_figure(fig, axe)
+        self.batch = {"fig": fig, "axe": axe, "artists": artists, "plot_type": plot_type}
+
+    def update_fonts(self, load=True):
         """ Update font definitions. Make sure the requested font is installed on your system.
         More about font settings at https://matplotlib.org/users/customizing.html
+
+        :param bool load: if False and matplotlib is not yet imported, only hfont is updated and the
+                          font properties are resolved with the first figure
         """
         self.hfont = {
             "family": self.font_family,
@@ -595,19 +1288,420 @@ class Plotter:
             "style": self.font_style,
              "fontname": self.font_name
         }
-        self.font = font_manager.FontProperties(
-            family=self.hfont["fontname"],
-            weight=self.hfont["weight"],
-            style=self.hfont["style"],
-            size=self.hfont["size"]
-        )
-        matplotlib.rcParams.update({"font.family": self.font_family})
-        matplotlib.rcParams.update({"font.weight": self.font_weight})
-        matplotlib.rcParams.update({"font.size": self.font_size})
-        matplotlib.rcParams.update({"font.style": self.font_style})
-        matplotlib.rcParams.update({"font.sans-serif": self.font_name})
-        matplotlib.rcParams.update({"font.serif": "Times"})
+        if plt is None and not load:
+            self.font = None
+            return
+        load_matplotlib()
+
+        font_key = (self.font_name, self.font_weight, self.font_style, self.font_size)
+        if font_key not in _FONT_CACHE:
+            _FONT_CACHE[font_key] = font_manager.FontProperties(
+                family=self.hfont["fontname"],
+                weight=self.hfont["weight"],
+                style=self.hfont["style"],
+                size=self.hfont["size"]
+            )
+        self.font = _FONT_CACHE[font_key]
+
+        rc_key = (self.font_family, self.font_weight, self.font_size, self.font_style, self.font_name)
+        if _FONT_RC[0] != rc_key or _FONT_RC[1] != [matplotlib.rcParams[key] for key in _FONT_RC_KEYS]:
+            matplotlib.rcParams.update({"font.family": self.font_family})
+            matplotlib.rcParams.update({"font.weight": self.font_weight})
+            matplotlib.rcParams.update({"font.size": self.font_size})
+            matplotlib.rcParams.update({"font.style": self.font_style})
+            matplotlib.rcParams.update({"font.sans-serif": self.font_name})
+            matplotlib.rcParams.update({"font.serif": "Times"})
+            _FONT_RC[:] = [rc_key, [matplotlib.rcParams[key] for key in _FONT_RC_KEYS]]
+
+    def wait_for_saves(self, timeout=None):
+        """ Wait for pending background saves (see save_figure)
+
+        :param float timeout: [optional] maximum seconds to wait
+        :return: list of saved file paths
+        """
+        done, pending = wait(self.save_futures, timeout=timeout)
+        if pending:
+            print("WARNING: %i figures are still being saved." % len(pending))
+        saved = []
+        for future in done:
+            if not future.exception():
+                saved += future.result()
+        self.save_futures = list(pending)
+        return saved
+
+    def write_figure(self, fig, paths, bbox_inches, record=None):
+        """ Encode and write a figure to one or more files (called by save_figure)
+
+        :param matplotlib.figure.Figure fig: figure
+        :param list paths: file paths (the extensions define the formats)
+        :param bbox_inches: "tight", Bbox, or float in inches
+        :param dict record: [optional] render_stats record where the encode time is added
+        :return: list of saved file paths
+        """
+        start = time.perf_counter() if record is not None else None
+        saved = []
+        for path in paths:
+            try:
+                fig.savefig(path, bbox_inches=bbox_inches)
+                print(" * Saved figure as: " + path)
+                saved.append(path)
+                if record is not None:
+                    self.record_stage("encode", start, record)
+                    start = time.perf_counter()
+            except Exception as problem:
+                print("WARNING: Could not save figure as path:\n  " + path)
+                print("         Hint: .JPG is not supported (use .pdf or .png).")
+                print(problem)
+        return saved
 
     def __call__(self):
         print("Class Info: <type> = Plotter (uses matplotlib library)")
 
+
+
+class LivePlot:
+    def __init__(self, plotter=None, n_channels=1, window=10.0, sample_rate=100.0, fps=25.0):
+        """ Live x-y plot of streaming sensor data with a fixed time window.
+        Samples are stored in a ring buffer of constant size and frames are redrawn with blitting
+        (only the graphs are redrawn) at a throttled frame rate.
+
+        Usage example:
+            live = LivePlot(Plotter(), n_channels=5, window=10., sample_rate=100.)
+            live.show()
+            while measuring:
+                live.append(t, samples)  # samples = array with one value (or column of values) per channel
+
+        :param Plotter plotter: [optional] Plotter instance that defines the styling (labels, fonts, y_lim, ...)
+        :param int n_channels: number of sensor channels (graphs)
+        :param float window: visible time window (same unit as the appended times, e.g., seconds)
+        :param float sample_rate: expected number of samples per time unit and channel (ring buffer size)
+        :param float fps: maximum number of frames per second
+        """
+        self.plotter = plotter or Plotter()
+        self.n_channels = int(n_channels)
+        self.window = float(window)
+        self.frame_interval = 1. / fps
+        self.capacity = int(np.ceil(self.window * sample_rate)) + 1
+
+        # every sample is stored twice so that the latest window is always a contiguous view (no copies)
+        self.times = np.full(2 * self.capacity, np.nan)
+        self.values = np.full((self.n_channels, 2 * self.capacity), np.nan)
+        self.head = 0  # next write position in the ring buffer
+        self.last_draw = 0.
+        self.background = None
+
+        p = self.plotter
+        self.fig = p.create_figure()
+        self.axe = self.fig.add_subplot(p.subplot_rows, p.subplot_cols, p.subplot_index)
+        color_map = p.get_color_map(self.n_channels)
+        self.lines = []
+        for ch in range(self.n_channels):
+            try:
+                label = p.data_labels[ch]
+                line_style = p.data_line_style[ch]
+            except IndexError:
+                label = "series" + str(ch)
+                line_style = "-"
+            self.lines.append(self.axe.plot([], [], linestyle=line_style, color=color_map(ch + 1), label=label,
+                                            animated=True)[0])
+
+        self.axe.set_xlim(-self.window, 0.)
+        self.axe.set_xlabel(p.x_label, **p.hfont)
+        self.axe.set_ylabel(p.y_label, **p.hfont)
+        if p.legend_active:
+            self.axe.legend(loc=p.legend_loc, prop=p.font, facecolor=p.legend_face_color,
+                            edgecolor=p.legend_edge_color, framealpha=p.legend_frame_alpha, fancybox=0)
+        show_fig = p.show_fig
+        p.show_fig = False
+        p.setup_figure(self.fig, self.axe)
+        p.show_fig = show_fig
+
+        # a full draw (first frame, resize, y-range change) renews the blitting background
+        self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.axe.bbox)
+        for line in self.lines:
+            self.axe.draw_artist(line)
+
+    def append(self, t, samples):
+        """ Append samples to the ring buffer and redraw if the frame interval has passed
+
+        :param t: float time of one sample per channel or 1d array of n sample times
+        :param samples: 1d array with one value per channel or 2d array with size = (n_channels, n)
+        :return: bool (True if a frame was drawn)
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        samples = np.asarray(samples, dtype=float).reshape(self.n_channels, -1)
+        if t.size > self.capacity:
+            # only the latest window fits into the buffer
+            t = t[-self.capacity:]
+            samples = samples[:, -self.capacity:]
+        index = (self.head + np.arange(t.size)) % self.capacity
+        self.times[index] = t
+        self.times[index + self.capacity] = t
+        self.values[:, index] = samples
+        self.values[:, index + self.capacity] = samples
+        self.head = (self.head + t.size) % self.capacity
+        return self.update()
+
+    def update(self, force=False):
+        """ Redraw the graphs (throttled to the frame rate unless force is True)
+
+        :param bool force: redraw regardless of the frame rate
+        :return: bool (True if a frame was drawn)
+        """
+        now = time.perf_counter()
+        if not force and now - self.last_draw < self.frame_interval:
+            return False
+        self.last_draw = now
+
+        # oldest to latest sample of the ring buffer (contiguous view)
+        times = self.times[self.head:self.head + self.capacity]
+        values = self.values[:, self.head:self.head + self.capacity]
+        rel_times = times - times[-1]
+        for line, channel_values in zip(self.lines, values):
+            line.set_data(rel_times, channel_values)
+
+        canvas = self.fig.canvas
+        if not self.plotter.y_lim_mode and np.isfinite(values).any():
+            y_min, y_max = np.nanmin(values), np.nanmax(values)
+            axe_min, axe_max = self.axe.get_ylim()
+            if y_min < axe_min or y_max > axe_max:
+                margin = 0.1 * (y_max - y_min) or 1.
+                self.axe.set_ylim(y_min - margin, y_max + margin)
+                self.background = None
+
+        if self.background is None:
+            # full redraw (renews the background through _on_draw)
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            for line in self.lines:
+                self.axe.draw_artist(line)
+            canvas.blit(self.axe.bbox)
+        canvas.flush_events()
+        return True
+
+    def show(self):
+        """ Show the live figure without blocking
+        """
+        plt.show(block=False)
+        plt.pause(0.001)
+
+    def close(self):
+        plt.close(self.fig)
+
+    def __call__(self):
+        print("Class Info: <type> = LivePlot (blitting x-y plot of streaming data)")
+
+
+class RenderCache(lru_store.LRUFileStore):
+    def __init__(self, cache_dir, max_bytes=2**30, link=True):
+        """ Opt-in cache of saved figures, addressed by the hash of the plot data, the plot type,
+        and the Plotter style attributes (see Plotter.make_cached_plot)
+        clear, drop, evict, and save_index: see fun.lru_store.LRUFileStore
+
+        :param str cache_dir: directory of the cache (created if it does not exist)
+        :param int max_bytes: size limit of all cached files (least recently used files are evicted first)
+        :param bool link: if True, cache hits are hard-linked to the target path (copied if linking fails);
+                          linked figures must not be edited in place
+        """
+        lru_store.LRUFileStore.__init__(self, cache_dir, max_bytes)
+        self.link = link
+
+    def fetch(self, key, paths):
+        """ Link or copy cached figures to paths
+
+        :param str key: plot key (see plot_key)
+        :param list paths: target file paths (the extensions define the formats)
+        :return: bool (False if any of the formats is not cached)
+        """
+        entries = [self.index.get(self.file_key(key, path)) for path in paths]
+        if not all(entries) or not all(os.path.isfile(os.path.join(self.cache_dir, e["file"])) for e in entries):
+            return False
+        for entry, path in zip(entries, paths):
+            source = os.path.join(self.cache_dir, entry["file"])
+            if os.path.isfile(path):
+                os.remove(path)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            try:
+                if not self.link:
+                    raise OSError
+                os.link(source, path)
+            except OSError:
+                shutil.copyfile(source, path)
+            entry["last_access"] = time.time()
+        self.save_index()
+        return True
+
+    @staticmethod
+    def file_key(key, path):
+        """ :return: str cache key of one output format (file extension of path) of a plot key """
+        return key + os.path.splitext(path)[1].lower()
+
+    @staticmethod
+    def plot_key(plotter, kind, data, kwargs=None):
+        """ Hash plot data, plot kind, keyword arguments (including plot_type), and the style attributes of a Plotter
+
+        :param Plotter plotter: instance of Plotter
+        :param str kind: "x_y", "surface", or "heatmap" (see Plotter.make_plot)
+        :param tuple data: plot data (arrays, nested lists, labels)
+        :param dict kwargs: keyword arguments of the plot function
+        :return: str hash
+        """
+        load_matplotlib()
+        key = hashlib.sha1()
+        key.update("|".join([kind, matplotlib.__version__]).encode())
+        RenderCache.hash_data(key, kwargs or {})
+        for item in data:
+            RenderCache.hash_data(key, item)
+        # style = plain attributes of the Plotter (fonts, color map, limits, labels, figure size, ...)
+        style = {name: val for name, val in plotter.__dict__.items()
+                 if name not in ("batch", "dir", "font", "render_stats", "save_futures", "timing_active") and
+                 isinstance(val, (str, int, float, bool, tuple, list, dict, type(None)))}
+        key.update(repr(sorted(style.items())).encode())
+        return key.hexdigest()
+
+    @staticmethod
+    def hash_data(key, item):
+        """ Update a hash with the full content of plot data (never with a shortened numpy repr)
+
+        :param key: hashlib hash object
+        :param item: array, (ragged) nested list or tuple, dict, or scalar
+        """
+        if isinstance(item, dict):
+            key.update(b"{")
+            for name in sorted(item, key=repr):
+                key.update(repr(name).encode())
+                RenderCache.hash_data(key, item[name])
+            key.update(b"}")
+            return
+        try:
+            array = np.asarray(item)
+        except ValueError:
+            # ragged nested lists
+            array = None
+        if array is not None and array.dtype == object and array.ndim:
+            try:
+                # for example, a list of datetime.datetime objects
+                array = np.asarray(item, dtype="datetime64[ns]")
+            except (TypeError, ValueError):
+                pass
+        if array is None or (array.dtype == object and array.ndim):
+            # hash every sub-array separately
+            key.update(("[%i:" % len(item)).encode())
+            for element in item:
+                RenderCache.hash_data(key, element)
+            key.update(b"]")
+        elif array.dtype == object:
+            # other scalars, for example, None
+            key.update(repr(item).encode())
+        else:
+            key.update((str(array.dtype) + str(array.shape)).encode())
+            key.update(np.ascontiguousarray(array).view(np.uint8))
+
+    def store(self, key, paths):
+        """ Copy saved figures into the cache
+
+        :param str key: plot key (see plot_key)
+        :param list paths: saved file paths
+        """
+        for path in paths:
+            file_key = self.file_key(key, path)
+            tmp_file = os.path.join(self.cache_dir, file_key + ".tmp")
+            shutil.copyfile(path, tmp_file)
+            os.replace(tmp_file, os.path.join(self.cache_dir, file_key))
+            self.index[file_key] = {"file": file_key, "bytes": os.path.getsize(path), "last_access": time.time(),
+                                    "source": os.path.abspath(path)}
+        self.evict()
+        self.save_index()
+
+    def __call__(self):
+        print("Class Info: <type> = RenderCache (%s)" % self.cache_dir)
+
+
+# worker-process state of render_many (one warmed-up Plotter per process)
+_RENDER_PLOTTER = None
+_RENDER_DEFAULTS = {}
+
+
+def _init_render_worker():
+    """ Initialize a render_many worker process: headless Agg backend and one warmed-up Plotter
+    """
+    global _RENDER_PLOTTER, _RENDER_DEFAULTS
+    load_matplotlib("Agg")
+    _RENDER_PLOTTER = Plotter()
+    _RENDER_PLOTTER.update_fonts()
+    _RENDER_DEFAULTS = dict(_RENDER_PLOTTER.__dict__)
+
+
+def _render_spec(spec, out_dir):
+    """ Render one plot specification of render_many in a worker process
+
+    :param dict spec: plot specification (see render_many)
+    :param str out_dir: output directory
+    :return: dict with file_name, path, seconds and error (None if successful)
+    """
+    start = time.perf_counter()
+    file_name = spec.get("file_name", "figure.png")
+    result = {"file_name": file_name, "path": os.path.join(out_dir, file_name), "seconds": None, "error": None}
+    if _RENDER_PLOTTER is None:
+        _init_render_worker()
+    plotter = _RENDER_PLOTTER
+    try:
+        # restore the default style and apply the style of this spec
+        plotter.__dict__.update({key: copy.copy(val) for key, val in _RENDER_DEFAULTS.items()})
+        for key, val in spec.get("style", {}).items():
+            setattr(plotter, key, val)
+        plotter.update_fonts()
+
+        kind = spec.get("kind", "x_y")
+        if plotter.make_plot(kind, spec.get("data", ()), **spec.get("kwargs", {})) == -1:
+            raise RuntimeError("make_plot failed (kind %s)" % kind)
+
+        if os.path.isfile(result["path"]):
+            os.remove(result["path"])
+        plotter.save_figure(result["path"])
+        if not os.path.isfile(result["path"]):
+            raise RuntimeError("could not save figure")
+    except Exception as problem:
+        result["error"] = str(problem)
+    finally:
+        plt.close("all")
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def render_many(plot_specs, out_dir, workers=None):
+    """ Render many plots headless (Agg backend) in parallel worker processes
+
+    Usage example:
+        specs = [{"kind": "x_y", "file_name": "station%i.png" % i, "data": (t, [q[i]]),
+                  "style": {"y_label": "Discharge (m3/s)"}} for i in range(5000)]
+        results = render_many(specs, "C:/temp/plots/", workers=8)
+
+    :param list plot_specs: dicts with the keys
+            kind = STR: "x_y", "surface", or "heatmap" (see Plotter.make_plot)
+            file_name = STR: output file name (the extension defines the format)
+            data = TUPLE: positional arguments of make_x_y_plot (x_data, y_data), make_surface_plot (x_data, y_data, Z),
+                   or make_heatmap (Z, x_labels, y_labels)
+            kwargs = DICT (optional): keyword arguments of make_x_y_plot / make_surface_plot, e.g., {"plot_type": "bar"}
+            style = DICT (optional): Plotter attributes to set before plotting, e.g., {"x_label": "Time (s)"}
+    :param str out_dir: directory where the figures are saved
+    :param int workers: number of worker processes (default: os.cpu_count())
+    :return: list of dicts (one per spec, same order) with file_name, path, seconds, and error (None if successful)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    plot_specs = list(plot_specs)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as pool:
+        results = list(pool.map(_render_spec, plot_specs, [out_dir] * len(plot_specs),
+                                chunksize=max(1, len(plot_specs) // (workers * 4))))
+    failed = [r for r in results if r["error"]]
+    print(" * Rendered %i figures in %.1f s (%i failed)." % (len(results) - len(failed), time.perf_counter() - start,
+                                                           len(failed)))
+    for r in failed:
+        print("WARNING: Could not render %s (%s)." % (r["file_name"], r["error"]))
+    return results
@@ -0,0 +1,204 @@
+#!/usr/bin/python
+""" Benchmark harness for workbooks/xlsx.py
+
+Generates synthetic workbooks (narrow and wide layouts) and records the wall time and peak memory (tracemalloc)
+of the Read / Workbook / StreamWorkbook methods in a machine-readable JSON report for comparing releases.
+
+Usage example:
+    python benchmark_xlsx.py --sizes 10000,100000 --out bench_xlsx.json
+    python benchmark_xlsx.py --compare bench_old.json bench_new.json
+"""
+import os, sys, json, time, argparse, platform, tempfile, tracemalloc
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+try:
+    import numpy as np
+    import openpyxl as oxl
+    import xlsx
+except ModuleNotFoundError:
+    print("ExceptionERROR: Missing packages (required: numpy, openpyxl).")
+
+LAYOUTS = {"narrow": 3, "wide": 30}
+# cases that address cells one by one are skipped above this number of rows unless --legacy-rows is raised
+LEGACY_CASES = ["read_cell", "read_matrix", "write_data2column", "write_data2row"]
+
+
+def generate_workbook(full_file_name, n_rows, n_cols):
+    # writes a synthetic gauge workbook: column A = station IDs (STR), columns B... = random FLOATs
+    rng = np.random.default_rng(42)
+    wb = xlsx.StreamWorkbook("data")
+    for start in range(0, n_rows, 10000):
+        block = rng.random((min(10000, n_rows - start), n_cols - 1)).tolist()
+        wb.write_rows([["S" + str(start + i)] + row for i, row in enumerate(block)])
+    wb.save_close_wb(full_file_name)
+
+
+def get_cases(n_rows, n_cols, template):
+    # returns LIST of TUPLES (case name, function(full_file_name))
+    last_col = xlsx.COL_NAMES[n_cols]
+    block = np.random.default_rng(0).random((n_rows, n_cols - 1))
+    lookup_ids = ["S" + str(i) for i in np.linspace(0, n_rows - 1, 100).astype(int)]
+
+    def reader(full_file_name):
+        return xlsx.Read(full_file_name, True, True, 0)
+
+    def cell_reader(full_file_name):
+        # cell-addressed methods re-parse read_only worksheets on every access
+        return xlsx.Read(full_file_name, False, True, 0)
+
+    def read_cell(full_file_name):
+        r = cell_reader(full_file_name)
+        for row in np.linspace(1, n_rows, 1000).astype(int):
+            r.read_cell("B", int(row))
+
+    def lookup_value_in_column(full_file_name):
+        r = reader(full_file_name)
+        r.set_max_row(n_rows + 1)
+        for val in lookup_ids:
+            r.lookup_value_in_column("A", val)
+
+    def lookup_value_in_row(full_file_name):
+        r = reader(full_file_name)
+        r.set_max_col(n_cols + 1)
+        for row in range(1, 101):
+            r.lookup_value_in_row(row, "S" + str(row - 1))
+
+    def write_data2column(full_file_name):
+        w = xlsx.Workbook(template, 0)
+        for col_num in range(2, n_cols + 1):
+            w.write_data2column(col_num, 1, block[:, col_num - 2].tolist())
+
+    def write_data2row(full_file_name):
+        w = xlsx.Workbook(template, 0)
+        for row, row_data in enumerate(block.tolist(), start=1):
+            w.write_data2row(row, "B", row_data)
+
+    def write_block(full_file_name):
+        xlsx.Workbook(template, 0).write_block("B1", block)
+
+    def stream_workbook(full_file_name):
+        w = xlsx.StreamWorkbook()
+        w.write_rows(block[i:i + 10000] for i in range(0, n_rows, 10000))
+        w.save_close_wb(os.path.join(os.path.dirname(template), "stream.xlsx"))
+
+    return [
+        ("open_wb", reader),
+        ("open_wb_readwrite", cell_reader),
+        ("read_cell", read_cell),
+        ("read_one_column", lambda f: reader(f).read_one_column("B", 1)),
+        ("read_matrix", lambda f: cell_reader(f).read_matrix("B", 1)),
+        ("read_block", lambda f: reader(f).read_block("B", 1, last_col)),
+        ("iter_matrix_blocks", lambda f: [b.sum() for b in reader(f).iter_matrix_blocks("B", 1)]),
+        ("read_multiple_columns", lambda f: reader(f).read_multiple_columns(1, "A:" + last_col)),
+        ("lookup_value_in_column", lookup_value_in_column),
+        ("lookup_value_in_row", lookup_value_in_row),
+        ("write_data2column", write_data2column),
+        ("write_data2row", write_data2row),
+        ("write_block", write_block),
+        ("stream_workbook", stream_workbook),
+    ]
+
+
+def measure(function, full_file_name, memory=True):
+    # returns TUPLE (seconds, peak bytes or None) -- the timing run is separate from the tracemalloc run
+    start = time.perf_counter()
+    function(full_file_name)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function(full_file_name)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def run_benchmarks(sizes, layouts, work_dir, **kwargs):
+    # sizes = LIST of INT row numbers
+    # layouts = LIST of STR keys of LAYOUTS
+    # kwargs: memory = BOOL (default: True), legacy_rows = INT, cases = LIST of STR case names (default: all)
+    # returns LIST of result DICTs
+    memory = kwargs.get("memory", True)
+    legacy_rows = kwargs.get("legacy_rows", 100000)
+    selected = kwargs.get("cases")
+    template = os.path.join(work_dir, "template.xlsx")
+    oxl.Workbook().save(template)
+
+    results = []
+    for n_rows in sizes:
+        for layout in layouts:
+            n_cols = LAYOUTS[layout]
+            full_file_name = os.path.join(work_dir, "bench_%i_%s.xlsx" % (n_rows, layout))
+            start = time.perf_counter()
+            generate_workbook(full_file_name, n_rows, n_cols)
+            print(" * Generated %s (%.1f s)" % (os.path.basename(full_file_name), time.perf_counter() - start), file=sys.stderr)
+            for name, function in get_cases(n_rows, n_cols, template):
+                if selected and name not in selected:
+                    continue
+                result = {"case": name, "rows": n_rows, "cols": n_cols, "layout": layout,
+                          "seconds": None, "peak_bytes": None, "status": "ok"}
+                if name in LEGACY_CASES and n_rows > legacy_rows:
+                    result["status"] = "skipped"
+                else:
+                    try:
+                        result["seconds"], result["peak_bytes"] = measure(function, full_file_name, memory)
+                    except Exception as problem:
+                        result["status"] = "error: " + str(problem)
+                print("   - {case:<24}{rows:>9} x {cols:<4}{status:<10}{seconds}".format(**result), file=sys.stderr)
+                results.append(result)
+            os.remove(full_file_name)
+    return results
+
+
+def compare_reports(old_report, new_report):
+    # prints the speedup of each case in NEW_REPORT relative to OLD_REPORT (both STR paths of JSON reports)
+    with open(old_report) as f:
+        old = {(r["case"], r["rows"], r["layout"]): r for r in json.load(f)["results"]}
+    with open(new_report) as f:
+        new = json.load(f)["results"]
+    for r in new:
+        ref = old.get((r["case"], r["rows"], r["layout"]))
+        if ref and ref["seconds"] and r["seconds"]:
+            print("{0:<24}{1:>9} {2:<7} speedup: {3:.2f}x".format(r["case"], r["rows"], r["layout"],
+                                                                ref["seconds"] / r["seconds"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workbooks/xlsx.py")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated row numbers")
+    parser.add_argument("--layouts", default="narrow,wide", help="comma-separated: " + ", ".join(LAYOUTS))
+    parser.add_argument("--cases", default="", help="comma-separated case names (default: all)")
+    parser.add_argument("--legacy-rows", type=int, default=100000,
+                        help="skip cell-by-cell legacy cases above this number of rows")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory runs")
+    parser.add_argument("--out", default="", help="JSON report file (default: print to stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_benchmarks([int(n) for n in args.sizes.split(",")], args.layouts.split(","), work_dir,
+                                 memory=not args.no_memory, legacy_rows=args.legacy_rows,
+                                 cases=[c for c in args.cases.split(",") if c])
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "openpyxl": oxl.__version__,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(" * Saved report as: " + args.out, file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,103 @@
 #!/usr/bin/python
-import os, sys, logging
+import os, sys, logging, re, time, hashlib, datetime, numbers
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fun import lru_store
 logging.basicConfig(filename='logfile.log', format='%(asctime)s %(message)s', level=logging.DEBUG)
 try:
+    import numpy as np
     import openpyxl as oxl
 except ModuleNotFoundError:
-    print("ExceptionERROR: Missing packages (required: os, sys, logging, openpyxl).")
+    print("ExceptionERROR: Missing packages (required: os, sys, logging, numpy, openpyxl).")
+
+
+def _build_col_names(max_col):
+    # returns LIST of column letters where list index = column number (index 0 = "")
+    names = [""]
+    for col_int in range(1, max_col + 1):
+        letters = ""
+        while col_int:
+            col_int, mod = divmod(col_int - 1, 26)
+            letters = chr(mod + 65) + letters
+        names.append(letters)
+    return names
+
+
+# precomputed column letters of all Excel columns (COL_NAMES[1] = "A", COL_NUMS["A"] = 1)
+MAX_COL = 16384
+COL_NAMES = _build_col_names(MAX_COL)
+COL_NUMS = {letters: col_int for col_int, letters in enumerate(COL_NAMES) if letters}
+
+def _cell2float(value):
+    # converts a single cell VALUE to float (empty or non-numeric cells become numpy.nan)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _values2float(rows, inf_value=None):
+    # rows = LIST of value tuples (one tuple per worksheet row)
+    # inf_value = FLOAT that replaces +/-inf entries (None keeps numpy.inf)
+    # returns 2D numpy.ndarray of floats
+    try:
+        # numpy converts None to nan and numeric strings to float in one call
+        data = np.array(rows, dtype=float)
+    except (TypeError, ValueError):
+        data = np.array([[_cell2float(v) for v in row] for row in rows], dtype=float)
+    if data.ndim < 2:
+        data = data.reshape(len(rows), -1)
+    if inf_value is not None:
+        inf_cells = np.isinf(data)
+        data[inf_cells] = np.copysign(float(inf_value), data[inf_cells])
+    return data
+
+
+INF_STRINGS = ("inf", "+inf", "-inf")  # cell strings that read_cell and read_block interpret as infinity
+
+
+def _infer_column(values, categorical=False, inf_value=None):
+    # values = LIST of cell values of one column
+    # categorical = BOOL - if True: string columns are returned as TUPLE (categories, INT codes)
+    # inf_value = FLOAT that replaces "inf" cells in numeric columns (None keeps numpy.inf)
+    # returns numpy.ndarray with inferred dtype (int64, float64, datetime64[us] or str)
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, numbers.Integral) for v in present) and len(present) == len(values) and present:
+        return np.array(values, dtype=np.int64)
+    if all(isinstance(v, numbers.Real) or (isinstance(v, str) and v.strip().lower() in INF_STRINGS)
+           for v in present):
+        # also covers integer columns with empty cells, all-empty columns and "inf" cells
+        data = np.array([float(v) if isinstance(v, str) else v for v in values], dtype=float)
+        if inf_value is not None:
+            inf_cells = np.isinf(data)
+            data[inf_cells] = np.copysign(float(inf_value), data[inf_cells])
+        return data
+    if all(isinstance(v, (datetime.datetime, datetime.date)) for v in present):
+        return np.array(values, dtype="datetime64[us]")
+    strings = np.array(["" if v is None else str(v) for v in values])
+    if categorical:
+        categories, codes = np.unique(strings, return_inverse=True)
+        return categories, codes.astype(np.int32)
+    return strings
+
+
+def parse_column_spec(columns):
+    # columns = STR column spec, e.g., "A:C,F", or LIST of column names / INT column numbers
+    # returns LIST of INT column numbers (A = 1)
+    if isinstance(columns, str):
+        columns = columns.replace(" ", "").split(",")
+    col_nums = []
+    for spec in columns:
+        if isinstance(spec, int):
+            col_nums.append(spec)
+            continue
+        try:
+            first, last = spec.upper().split(":")
+            col_nums.extend(range(COL_NUMS[first], COL_NUMS[last] + 1))
+        except ValueError:
+            col_nums.append(COL_NUMS[spec.upper()])
+    return col_nums
 
 
 class Read:
@@ -15,6 +107,10 @@ class Read:
         # args[2] = BOOL of data_only
         # args[3] = worksheet -- INT sheet number in workbook
 
+        # cached lookup indices {column/row number: {normalized value: first row/column number}} of the worksheet
+        self._col_lookup = {}
+        self._row_lookup = {}
+
         try:
             # open workbook in readwrite mode if commanded and data_only modes
             self.open_wb(args[0], args[1], args[2])
@@ -55,6 +151,10 @@ class Read:
 
     def col_name_to_num(self, letters):
         # letters = STR of column name, e.g., 'AB'
+        try:
+            return COL_NUMS[letters.upper()] + 64
+        except (AttributeError, KeyError):
+            pass
         pow = 1
         col_int = 0
         for letter in letters[::-1]:
@@ -64,6 +164,8 @@ class Read:
 
     def col_num_to_name(self, col_int):
         col_int -= 64
+        if 0 < col_int <= MAX_COL:
+            return COL_NAMES[col_int]
         letters = ''
         while col_int:
             mod = (col_int - 1) % 26
@@ -71,28 +173,80 @@ class Read:
             col_int = (col_int - 1) // 26
         return ''.join(reversed(letters))
 
+    def col_to_index(self, column):
+        # column = STR of column name, e.g., 'AB', or INT column number (A = 1)
+        # returns INT column number (A = 1) for direct ws.cell(row, column) access
+        if isinstance(column, int):
+            return column
+        try:
+            return COL_NUMS[column]
+        except KeyError:
+            return self.col_name_to_num(str(column)) - 64
+
     def lookup_value_in_column(self, col, val):
         # returns the first row number that contains a VALUE val in a COLUMN col
-        # col = STR of column number, e.g., col = 'A'
+        # col = STR of column name, e.g., col = 'A', or INT column number (A = 1)
         # val = STR/FLOAT/INT value to look up in column
 
-        col_num = self.col_name_to_num(col) - 64
-        for i in range(1, self.max_row):
-            if str(self.ws.cell(row=i, column=col_num).value).lower() == str(val).lower():
-                return i
+        # the index of a column is built once and reused until the column is modified
+
+        col_num = self.col_to_index(col)
+        if self.max_row <= 1:
+            # empty row range (openpyxl would read max_row=0 as no limit)
+            return None
+        try:
+            index = self._col_lookup[col_num]
+        except KeyError:
+            index = {}
+            row_no = 1
+            for values in self.ws.iter_rows(min_row=1, max_row=self.max_row - 1, min_col=col_num, max_col=col_num,
+                                            values_only=True):
+                index.setdefault(str(values[0]).lower(), row_no)
+                row_no += 1
+            self._col_lookup[col_num] = index
+        return index.get(str(val).lower())
 
     def lookup_value_in_row(self, row, val):
         # returns the first row number that contains a VALUE val in a ROW row
         # row = INT of row number, e.g., col = 'A' (min. 1!)
         # val = STR/FLOAT/INT value to look up in column
 
-        for j in range(1, self.max_col):
-            if str(self.ws.cell(row=row, column=j).value).lower() == str(val).lower():
-                return self.col_num_to_name(j + 64)
+        # the index of a row is built once and reused until the row is modified
+
+        if self.max_col <= 1:
+            # empty column range (openpyxl would read max_col=0 as no limit)
+            return None
+        try:
+            index = self._row_lookup[row]
+        except KeyError:
+            index = {}
+            for values in self.ws.iter_rows(min_row=row, max_row=row, min_col=1, max_col=self.max_col - 1,
+                                            values_only=True):
+                for j, value in enumerate(values, start=1):
+                    index.setdefault(str(value).lower(), j)
+            self._row_lookup[row] = index
+        try:
+            return COL_NAMES[index[str(val).lower()]]
+        except KeyError:
+            return None
+
+    def drop_lookup_index(self, col_num=None, rows=()):
+        # invalidates cached lookup indices after cells were modified
+        # col_num = INT column number (A = 1) or None
+        # rows = iterable of INT row numbers
+        self._col_lookup.pop(col_num, None)
+        for row in rows:
+            self._row_lookup.pop(row, None)
+
+    def drop_lookup_indices(self):
+        # invalidates all cached lookup indices (the worksheet or workbook changed)
+        self._col_lookup = {}
+        self._row_lookup = {}
 
     def open_wb(self, xlsx_name, *read_modes):
         # read_modes[0] = read only -- BOOL (if true: read only = TRUE)
         # read_modes[1] = data only -- BOOL (if true: data only = TRUE)
+        self.drop_lookup_indices()
         try:
             self.wb = oxl.load_workbook(filename=xlsx_name, read_only=read_modes[0], data_only=read_modes[1])
         except KeyError:
@@ -104,6 +258,7 @@ class Read:
 
     def open_ws(self, worksheet):
         # worksheet = INT
+        self.drop_lookup_indices()
         try:
             self.ws = self.wb.worksheets[worksheet]
         except KeyError:
@@ -114,13 +269,67 @@ class Read:
                 self.ws = []
                 logging.info("ERROR: No worksheet available.")
 
+    def read_block(self, start_col, start_row, end_col=None, end_row=None, **kwargs):
+        # reads a rectangular block beginning at cell (start_col, start_row) in a single pass over the rows
+        # start_col = CHR, e.g., start_col = "B"
+        # start_row = INT (First Row = 1, not 0 as in a list!)
+        # end_col = CHR - last column to read (default: start_col)
+        # end_row = INT - last row to read (default: None reads until start_col meets an empty cell)
+        # kwargs:
+        #   inf_value = FLOAT that replaces "inf" cells, e.g., 10**10 as in read_cell (default: None keeps numpy.inf)
+        #   structured = BOOL - if True: returns a structured array with one field per column
+        #   names = LIST of field names for structured arrays (default: column letters)
+        # returns numpy.ndarray of FLOATs with shape (rows, columns) where empty cells are numpy.nan
+        inf_value = kwargs.get("inf_value")
+        min_col = self.col_to_index(start_col)
+        if end_col:
+            max_col = self.col_to_index(end_col)
+        else:
+            max_col = min_col
+
+        rows = list(self._iter_block_rows(min_col, start_row, max_col, end_row))
+        if not rows:
+            logging.info("   * WARNING: Empty block at " + str(start_col) + str(start_row))
+            rows = np.empty((0, max_col - min_col + 1))
+
+        if not kwargs.get("structured"):
+            return _values2float(rows, inf_value)
+
+        names = kwargs.get("names")
+        if not names:
+            names = COL_NAMES[min_col:max_col + 1]
+        columns = list(zip(*rows)) if len(rows) else [() for n in names]
+        fields = []
+        for col_values in columns:
+            try:
+                field = np.array(col_values, dtype=float)
+                if inf_value is not None:
+                    field[np.isinf(field)] = np.copysign(float(inf_value), field[np.isinf(field)])
+            except (TypeError, ValueError):
+                # non-numeric column -> string field
+                field = np.array(["" if v is None else str(v) for v in col_values])
+            fields.append(field)
+        block = np.empty(len(rows), dtype=[(str(n), f.dtype) for n, f in zip(names, fields)])
+        for name, field in zip(names, fields):
+            block[str(name)] = field
+        return block
+
+    def _iter_block_rows(self, min_col, min_row, max_col, max_row):
+        # yields the value tuples of a block defined by INT column numbers (A = 1) and INT rows
+        # max_row = None stops at the first empty cell in min_col
+        for values in self.ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col,
+                                        values_only=True):
+            if max_row is None and values[0] is None:
+                break
+            yield values
+
     def read_cell(self, column, row):
-        # column = CHR - cell column
+        # column = CHR - cell column or INT column number (A = 1)
         # row = INT - cell row
         # reads COLUMN / ROW cell
         try:
-            cell_value = str(self.ws[str(column) + str(row)].value)
-        except KeyError:
+            cell_value = str(self.ws.cell(row=row, column=self.col_to_index(column)).value)
+        except (KeyError, ValueError):
             cell_value = "None"
             logging.info("   * WARNING: Undefined cell " + str(column) + str(row))
 
@@ -134,34 +343,98 @@ class Read:
 
     def read_one_column(self, column, start_row):
         # reads COLUMN beginning at START_ROW until it meets an empty cell
-        # col = STR, e.g., col = "B"
+        # col = STR, e.g., col = "B", or INT column number (A = 1)
         # start_row = INT
         # returns column as LIST
         data = []
-        valid_content = True
-        __row__ = start_row
-        while valid_content:
-            try:
-                cell_value = str(self.ws[str(column) + str(__row__)].value)
-            except KeyError:
-                cell_value = "None"
-                logging.info("   * WARNING: Undefined cell " + str(column) + str(__row__))
-
-            if not(cell_value == "None"):
+        col_num = self.col_to_index(column)
+        try:
+            for values in self._iter_block_rows(col_num, start_row, col_num, None):
+                cell_value = str(values[0])
+                if cell_value == "None":
+                    break
                 try:
                     data.append(float(cell_value))
                 except ValueError:
                     if cell_value.lower() == "inf":
                         cell_value = float(10**10)
                     data.append(cell_value)
-                __row__ += 1
-            else:
-                valid_content = False
+        except ValueError:
+            logging.info("   * WARNING: Undefined cell " + str(column) + str(start_row))
         return data
 
-    def read_multiple_columns(self, start_row=0, columns="ABC"):
-        return [self.ws["{}{}".format(column, row)].value for row in range(start_row, len(self.ws.rows) + 1) for column
-                in columns]
+    def iter_matrix_blocks(self, start_col, start_row, block_size=10000, **kwargs):
+        # generator version of read_matrix that yields row blocks as 2D numpy arrays of FLOATs
+        # start_col = CHR, e.g., start_col = "B", or INT column number (A = 1)
+        # start_row = INT (First Row = 1, not 0 as in a list!)
+        # block_size = INT number of rows per block (the last block may be shorter)
+        # kwargs:
+        #   end_col = CHR or INT - last column (default: last non-empty column of start_row as in read_matrix)
+        #   inf_value = FLOAT that replaces "inf" cells (default: None keeps numpy.inf)
+        # stops where start_col meets an empty cell; empty cells inside the matrix become numpy.nan
+        # open the workbook with read_only=True to stream rows without loading the full worksheet
+        min_col = self.col_to_index(start_col)
+        if kwargs.get("end_col"):
+            max_col = self.col_to_index(kwargs.get("end_col"))
+        else:
+            max_col = min_col - 1
+            for values in self.ws.iter_rows(min_row=start_row, max_row=start_row, min_col=min_col,
+                                            values_only=True):
+                for value in values:
+                    if value is None:
+                        break
+                    max_col += 1
+            if max_col < min_col:
+                return
+
+        rows = []
+        for values in self._iter_block_rows(min_col, start_row, max_col, None):
+            rows.append(values)
+            if len(rows) == block_size:
+                yield _values2float(rows, kwargs.get("inf_value"))
+                rows = []
+        if rows:
+            yield _values2float(rows, kwargs.get("inf_value"))
+
+    def read_multiple_columns(self, start_row=1, columns="A:C", **kwargs):
+        # reads multiple columns beginning at START_ROW in a single pass until the last non-empty row
+        # start_row = INT (First Row = 1, not 0 as in a list!)
+        # columns = STR column spec, e.g., "A:C,F", or LIST of column names / INT column numbers
+        # kwargs:
+        #   structured = BOOL - if True: returns a structured array with one field per column
+        #   categorical = BOOL - if True: string columns are returned as TUPLE (categories, INT codes)
+        #   inf_value = FLOAT that replaces "inf" cells of numeric columns, e.g., 10**10 as in read_cell
+        #               (default: None keeps numpy.inf)
+        # returns DICT {column letters: numpy.ndarray} with one inferred dtype per column
+        #   (int64, float64 with nan for empty cells, datetime64[us] or str)
+        col_nums = parse_column_spec(columns)
+        min_col = min(col_nums)
+        positions = [c - min_col for c in col_nums]
+
+        data = [[] for c in col_nums]
+        n_rows = 0
+        for values in self.ws.iter_rows(min_row=start_row, min_col=min_col, max_col=max(col_nums),
+                                        values_only=True):
+            for column_data, pos in zip(data, positions):
+                try:
+                    column_data.append(values[pos])
+                except IndexError:
+                    column_data.append(None)
+            if any(column_data[-1] is not None for column_data in data):
+                n_rows = len(data[0])
+
+        structured = kwargs.get("structured")
+        categorical = kwargs.get("categorical") and not structured
+        result = {}
+        for col_num, column_data in zip(col_nums, data):
+            result[COL_NAMES[col_num]] = _infer_column(column_data[:n_rows], categorical, kwargs.get("inf_value"))
+        if not structured:
+            return result
+
+        block = np.empty(n_rows, dtype=[(name, arr.dtype) for name, arr in result.items()])
+        for name, arr in result.items():
+            block[name] = arr
+        return block
 
     def read_matrix(self, start_col, start_row, *args, **kwargs):
         # reads matrix beginning at cell (start_col, start_row) until it meets an empty cell
@@ -196,7 +469,8 @@ class Read:
     def read_row_str(self, row, start_col, **kwargs):
         # reads ROW beginning at COL until it meets an empty cell
         # row = INT (First Row = 1, not 0 as in a list!)
-        # start_col = CHR, e.g., start_col = "B"
+        # start_col = CHR, e.g., start_col = "B", or INT column number (A = 1)
+        # kwargs: col_skip = INT, end_col = CHR or INT, if_row = INT
 
         # parse optional arguments
         col_skip = kwargs.get("col_skip")
@@ -213,37 +487,25 @@ class Read:
             if_row = row
 
         str_data = []
-        valid_content = True
-        __col__ = start_col
-        end_col_num = self.col_name_to_num(end_col)
-
-        while valid_content:
-            cell_string = str(self.ws[str(__col__) + str(row)].value)
-            valid_content = self.test_cell_content(str(__col__), if_row)
-            if valid_content:
-                str_data.append(cell_string)
-
-            # update column to read next relevant row entry
-            __col_num__ = self.col_name_to_num(__col__)  # convert ascii-chr to int
-            __col_num__ += col_skip                      # add col_skip
-
-            if not (__col_num__ > end_col_num):
-                __col__ = self.col_num_to_name(__col_num__)  # re-convert int to ascii-chr
-            else:
-                valid_content = False
+        for __col_num__ in range(self.col_to_index(start_col), self.col_to_index(end_col) + 1, col_skip):
+            if self.ws.cell(row=if_row, column=__col_num__).value is None:
+                break
+            str_data.append(str(self.ws.cell(row=row, column=__col_num__).value))
         return str_data
 
     def set_max_col(self, col_number):
         self.max_col = int(col_number)
+        self._row_lookup = {}
 
     def set_max_row(self, row_number):
         self.max_row = int(row_number)
+        self._col_lookup = {}
 
     def test_cell_content(self, column, row):
-        # column = CHR - cell column
+        # column = CHR - cell column or INT column number (A = 1)
         # row = INT - cell row
         # reads COLUMN / ROW cell
-        if str(self.ws[column + str(row)].value) == "None":
+        if str(self.ws.cell(row=row, column=self.col_to_index(column)).value) == "None":
             return False
         else:
             return True
@@ -280,29 +542,67 @@ class Workbook(Read):
         except:
             logging.info("ERROR: Invalid file name or data.")
 
+    def write_block(self, top_left, array_2d, **kwargs):
+        # writes a 2D block into the (template) worksheet in one pass using integer cell coordinates
+        # top_left = STR of the upper-left cell, e.g., "B2", or TUPLE (row, column) with column as CHR or INT
+        # array_2d = 2D numpy.ndarray or nested LIST [rows*[column elements]] (nan is written as empty cell)
+        # kwargs: number_format = STR applied to all written cells, e.g., "0.00" (default: keep template format)
+        if isinstance(top_left, str):
+            start_col, start_row = parse_range_spec(top_left)[:2]
+        else:
+            start_row, start_col = top_left
+        start_col = self.col_to_index(start_col)
+        number_format = kwargs.get("number_format")
+        if isinstance(array_2d, np.ndarray):
+            array_2d = array_2d.tolist()
+
+        logging.info("   * Writing data block starting at " + COL_NAMES[start_col] + str(start_row) + " ...")
+        n_cols = 0
+        __row__ = start_row
+        for row_data in array_2d:
+            __col__ = start_col
+            for val in row_data:
+                if isinstance(val, float) and val != val:
+                    val = None
+                cell = self.ws.cell(row=__row__, column=__col__, value=val)
+                if number_format:
+                    cell.number_format = number_format
+                __col__ += 1
+            n_cols = max(n_cols, __col__ - start_col)
+            __row__ += 1
+
+        for col_num in range(start_col, start_col + n_cols):
+            self.drop_lookup_index(col_num)
+        self.drop_lookup_index(rows=range(start_row, __row__))
+        logging.info("   * Wrote " + str(__row__ - start_row) + " x " + str(n_cols) + " cells.")
+
     def write_data2cell(self, column, row, value):
-        # writes VALUE to cell COLUMN (e.g., 'A') and ROW (e.g., 1)
+        # writes VALUE to cell COLUMN (e.g., 'A' or INT 1) and ROW (e.g., 1)
+        col_num = self.col_to_index(column)
         try:
-            self.ws[str(column) + str(row)].value = value
-        except KeyError:
+            self.ws.cell(row=row, column=col_num).value = value
+        except (KeyError, ValueError):
             logging.info("   * ERROR: Could not write value to CELL " + str(column) + str(row))
+        self.drop_lookup_index(col_num, [row])
 
     def write_data2column(self, column, start_row, data_list):
-        # writes COLUMN (STR, e.g., 'A') beginning at START_ROW (INT, e.g., 1)
+        # writes COLUMN (STR, e.g., 'A', or INT column number) beginning at START_ROW (INT, e.g., 1)
         # data_list is a LIST object
         logging.info("   * Writing column data starting at " + str(column) + str(start_row) + " ...")
+        col_num = self.col_to_index(column)
         __row__ = start_row
         for val in data_list:
             try:
-                self.ws[str(column) + str(__row__)].value = val
-            except KeyError:
+                self.ws.cell(row=__row__, column=col_num).value = val
+            except (KeyError, ValueError):
                 logging.info("   * WARNING: Could not write column entry: " + str(val))
             __row__ += 1
+        self.drop_lookup_index(col_num, range(start_row, __row__))
 
     def write_data2row(self, row_no, start_col, data_list, **kwargs):
         # writes ROW beginning at COL
         # row_no = INT of row number to write in
-        # start_col = CHR, e.g., start_col = "B"
+        # start_col = CHR, e.g., start_col = "B", or INT column number (A = 1)
         # data_list = LIST of data to write
 
         # parse optional arguments
@@ -316,15 +616,252 @@ class Workbook(Read):
             end_col = "XFA"
 
         logging.info("   * Writing data row starting at " + str(start_col) + str(row_no) + " ...")
-        __col__ = start_col
-        end_col_num = self.col_name_to_num(end_col)
+        __col_num__ = self.col_to_index(start_col)
+        end_col_num = self.col_to_index(end_col)
 
         for val in data_list:
-            self.ws[str(__col__) + str(row_no)].value = val
+            if __col_num__ > end_col_num:
+                logging.info("   * WARNING: data_list exceeds end_col " + str(end_col))
+                break
+            self.ws.cell(row=row_no, column=__col_num__).value = val
+            self.drop_lookup_index(__col_num__)
+            __col_num__ += col_skip
+        self.drop_lookup_index(rows=[row_no])
+
 
-            # update column to read next relevant row entry
-            __col_num__ = self.col_name_to_num(__col__)  # convert ascii-chr to int
-            __col_num__ += col_skip                      # add col_skip
+class StreamWorkbook:
+    def __init__(self, *args, **kwargs):
+        # streaming export workbook based on openpyxl's write-only mode (memory use does not grow with the sheet size)
+        # args[0] = STR worksheet title (optional, default: "Sheet")
+        # rows can only be appended -- templates and cell addressing require Workbook
+        try:
+            title = str(args[0])
+        except IndexError:
+            title = "Sheet"
+        self.wb = oxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(title)
+        self.rows_written = 0
+
+        # color definitions -- more: https://www.computerhope.com/htmcolor.htm
+        self.white = 'FFFFFFFF'
 
-            if not (__col_num__ > end_col_num):
-                __col__ = self.col_num_to_name(__col_num__)  # re-convert int to ascii-chr
+    def save_close_wb(self, full_file_path):
+        try:
+            logging.info("   * Saving as: " + full_file_path + " (" + str(self.rows_written) + " rows)")
+            self.wb.save(full_file_path)
+            self.wb.close()
+        except:
+            logging.info("ERROR: Invalid file name or data.")
+
+    def write_header(self, data_list, **kwargs):
+        # writes a (styled) header row -- must be called before write_rows
+        # data_list = LIST of header entries
+        # kwargs: bold = BOOL (default: True)
+        #         fill_color = STR of hex color, e.g., "FFD3D3D3" (default: None)
+        #         number_format = STR applied to the header cells (default: None)
+        bold = kwargs.get("bold", True)
+        fill_color = kwargs.get("fill_color")
+        number_format = kwargs.get("number_format")
+        header = []
+        for val in data_list:
+            cell = oxl.cell.WriteOnlyCell(self.ws, value=val)
+            cell.font = oxl.styles.Font(bold=bold)
+            if fill_color:
+                cell.fill = oxl.styles.PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
+            if number_format:
+                cell.number_format = number_format
+            header.append(cell)
+        self.ws.append(header)
+        self.rows_written += 1
+
+    def write_rows(self, rows):
+        # appends rows from any iterable (LIST, TUPLE, generator) without keeping them in memory
+        # rows = iterable of row sequences or 2D numpy.ndarray blocks (one block = many rows)
+        logging.info("   * Streaming rows starting at row " + str(self.rows_written + 1) + " ...")
+        for row in rows:
+            if isinstance(row, np.ndarray) and row.ndim == 2:
+                for block_row in row.tolist():
+                    self.ws.append(block_row)
+                self.rows_written += row.shape[0]
+                continue
+            if isinstance(row, np.ndarray):
+                row = row.tolist()
+            self.ws.append(row)
+            self.rows_written += 1
+
+    def __call__(self):
+        print("Class Info: <type> = XLSX streaming export")
+
+
+class SheetCache(lru_store.LRUFileStore):
+    def __init__(self, cache_dir, max_bytes=2**30):
+        # opt-in cache of converted worksheet blocks stored as memory-mappable .npy files
+        # cache_dir = STR directory of the cache (created if it does not exist)
+        # max_bytes = INT size limit of all cached arrays (least recently used entries are evicted first)
+        # clear, drop, evict and save_index: see fun.lru_store.LRUFileStore
+        lru_store.LRUFileStore.__init__(self, cache_dir, max_bytes)
+
+    def on_evict(self, entry):
+        logging.info("   * Evicting cached sheet data of " + entry["source"])
+
+    def file_key(self, full_file_name):
+        # full_file_name = STR of a workbook path
+        # returns STR hash of path, size, modification time and content of the workbook
+        stat = os.stat(full_file_name)
+        content = hashlib.sha1()
+        with open(full_file_name, "rb") as f:
+            for chunk in iter(lambda: f.read(2**20), b""):
+                content.update(chunk)
+        key = "|".join([os.path.abspath(full_file_name), str(stat.st_size), str(stat.st_mtime_ns),
+                        content.hexdigest()])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def read_block(self, full_file_name, sheet=0, range_spec="A1", **kwargs):
+        # reads a block like Read.read_block and maps it from the cache if the workbook did not change
+        # full_file_name = STR of a workbook path
+        # sheet = INT sheet number in workbook
+        # range_spec = STR, e.g., "B2:D" (see parse_range_spec)
+        # kwargs: inf_value, structured, names = passed to Read.read_block
+        # returns numpy.ndarray (read-only numpy.memmap on cache hits)
+        key = hashlib.sha1("|".join([self.file_key(full_file_name), str(sheet), str(range_spec),
+                                     repr(sorted(kwargs.items()))]).encode()).hexdigest()
+        entry = self.index.get(key)
+        if entry:
+            try:
+                data = np.load(os.path.join(self.cache_dir, entry["file"]), mmap_mode="r")
+                entry["last_access"] = time.time()
+                self.save_index()
+                return data
+            except (OSError, ValueError):
+                self.drop(key)
+
+        start_col, start_row, end_col, end_row = parse_range_spec(range_spec)
+        reader = Read(full_file_name, True, True, sheet)
+        try:
+            data = reader.read_block(start_col, start_row, end_col, end_row, **kwargs)
+        finally:
+            reader.close_wb()
+
+        file_name = key + ".npy"
+        tmp_file = os.path.join(self.cache_dir, key + ".tmp.npy")
+        np.save(tmp_file, data)
+        os.replace(tmp_file, os.path.join(self.cache_dir, file_name))
+        self.index[key] = {"file": file_name, "bytes": int(data.nbytes), "last_access": time.time(),
+                           "source": os.path.abspath(full_file_name), "sheet": sheet, "range": str(range_spec)}
+        self.evict()
+        self.save_index()
+        return data
+
+    def __call__(self):
+        print("Class Info: <type> = XLSX sheet cache (%s)" % self.cache_dir)
+
+
+def parse_range_spec(range_spec):
+    # range_spec = STR, e.g., "B2" (one open-ended column), "B2:D" (open-ended block) or "B2:D100" (rectangle)
+    # returns TUPLE (start_col, start_row, end_col, end_row) where end_row = None for open-ended ranges
+    match = re.match(r"^([A-Za-z]+)(\d+)(?::([A-Za-z]+)(\d*))?$", str(range_spec).strip())
+    if not match:
+        raise ValueError("Invalid range_spec (use, e.g., B2:D or B2:D100): " + str(range_spec))
+    start_col, start_row, end_col, end_row = match.groups()
+    return (start_col.upper(), int(start_row), (end_col or start_col).upper(),
+            int(end_row) if end_row else None)
+
+
+def _read_many_worker(path, sheet, range_spec, shm_min_bytes, block_kwargs):
+    # reads one workbook in a worker process
+    # returns TUPLE ("array", ndarray), ("shm", name, shape, dtype) or ("error", message)
+    try:
+        start_col, start_row, end_col, end_row = parse_range_spec(range_spec)
+        reader = Read(path, True, True, sheet)
+        if reader.wb is None or reader.ws is None:
+            raise ValueError("could not open workbook")
+        try:
+            data = reader.read_block(start_col, start_row, end_col, end_row, **block_kwargs)
+        finally:
+            reader.close_wb()
+    except Exception as problem:
+        return "error", str(problem)
+
+    if data.nbytes < shm_min_bytes or data.dtype.fields is not None:
+        return "array", data
+    # large float blocks are handed back through shared memory instead of being pickled
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[:] = data
+    shm.close()
+    # the parent process attaches to, copies and unlinks the block (the resource tracker removes it otherwise)
+    return "shm", shm.name, data.shape, data.dtype.str
+
+
+def _read_many_result(path, result):
+    # converts a worker result into the (path, array, error) tuple returned by read_many
+    if result[0] == "error":
+        logging.info("   * ERROR: Could not read " + str(path) + " (" + result[1] + ")")
+        return path, None, result[1]
+    if result[0] == "array":
+        return path, result[1], None
+    shm = shared_memory.SharedMemory(name=result[1])
+    try:
+        data = np.ndarray(result[2], dtype=np.dtype(result[3]), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return path, data, None
+
+
+def _unlink_shared_block(name):
+    # removes a shared memory block of _read_many_worker without reading it
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def read_many(paths, sheet=0, range_spec="A1", workers=None, **kwargs):
+    # reads the same range from many workbooks in a process pool
+    # paths = LIST of STR - absolute paths of workbooks
+    # sheet = INT sheet number in workbook
+    # range_spec = STR, e.g., "B2:D" (until empty cell) or "B2:D100" (see parse_range_spec)
+    # workers = INT number of worker processes (default: os.cpu_count())
+    # kwargs:
+    #   ordered = BOOL - if True (default) results are yielded in the order of paths, otherwise as they complete
+    #   shared_memory_min = INT minimum array size in bytes returned through shared memory (default: 1 MB)
+    #   inf_value, structured, names = passed to Read.read_block
+    # yields TUPLE (path, numpy.ndarray or None, STR error message or None) per workbook
+    ordered = kwargs.pop("ordered", True)
+    shm_min_bytes = kwargs.pop("shared_memory_min", 2 ** 20)
+    paths = list(paths)
+    parse_range_spec(range_spec)  # raise invalid range specifications before starting the pool
+    logging.info("   * Reading " + str(len(paths)) + " workbooks (range " + str(range_spec) + ") ...")
+
+    # workers share the resource tracker of this process: blocks that are not unlinked are removed at exit
+    resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_read_many_worker, path, sheet, range_spec, shm_min_bytes, kwargs): path
+                   for path in paths}
+        if ordered:
+            pending = list(futures)
+        else:
+            pending = as_completed(futures)
+        consumed = set()
+        try:
+            for future in pending:
+                consumed.add(future)
+                try:
+                    result = future.result()
+                except Exception as problem:
+                    # for example, a crashed worker process
+                    result = ("error", str(problem))
+                yield _read_many_result(futures[future], result)
+        finally:
+            # the caller stopped early (break or exception): unlink the shared memory of unconsumed results
+            for future in futures:
+                if future in consumed or future.cancel():
+                    continue
+                try:
+                    result = future.result()
+                except Exception:
+                    continue
+                if result[0] == "shm":
+                    _unlink_shared_block(result[1])